@@ -5,11 +5,12 @@ Provides animated GIF output for tiles.
 
 import random
 from pathlib import Path
-from typing import Tuple
+from typing import BinaryIO, Iterator, List, Tuple, Union
 
-from PIL import Image, ImageDraw
+from PIL import Image, ImageFont
 
 from aoc_tiles.fonts import secondary_font
+from aoc_tiles.glyphs import text_mask
 
 
 class Animation:
@@ -20,8 +21,19 @@ class Animation:
     def __init__(self, config):
         self.config = config
 
+    def common_texts(self) -> List[Tuple[ImageFont.FreeTypeFont, str, int]]:
+        """Texts (font, text, stroke width) which are on many tiles, their masks are persisted, see glyphs."""
+        return []
+
     def animate(self, base_image: Image.Image, path: Path) -> None:
         """Create an animated GIF from the base image and save to path."""
+        self.save(base_image, path.with_suffix(".gif"), seed=str(path))
+
+    def save(self, base_image: Image.Image, fp: Union[Path, BinaryIO], seed: str) -> None:
+        """Create an animated GIF from the base image and write it to a path or file object.
+
+        The seed makes the animation deterministic, but different for each tile.
+        """
         raise NotImplementedError
 
 
@@ -46,30 +58,55 @@ class SnowAnimation(Animation):
         self.num_frames = num_frames
         self.num_flakes = num_flakes
 
-    def animate(self, base_image: Image.Image, path: Path) -> None:
-        """Create a seamlessly looping snow animation GIF."""
-        frames = []
+    def common_texts(self) -> List[Tuple[ImageFont.FreeTypeFont, str, int]]:
+        return [(secondary_font(size), char, 0) for size in range(6, 13) for char in self.SNOW_CHARS]
+
+    def save(self, base_image: Image.Image, fp: Union[Path, BinaryIO], seed: str) -> None:
+        """Create a seamlessly looping snow animation GIF.
+
+        Flakes are pasted from cached glyph masks at whole pixel positions, and all frames are quantized to the
+        palette of the first frame. This looks the same as drawing each flake as text at its exact position with a
+        palette per frame, but the pixels differ slightly.
+        """
         width, height = base_image.size
         loop_height = height + 20  # Total height including off-screen
 
-        # Use path (contains year/day) as seed for consistent but unique snow per tile
-        seed = sum(ord(c) * (i + 1) for i, c in enumerate(str(path)))
-        random.seed(seed)
+        # The seed is usually the path (contains year/day), for consistent but unique snow per tile
+        random.seed(sum(ord(c) * (i + 1) for i, c in enumerate(seed)))
         flakes = []
         for _ in range(self.num_flakes):
             flakes.append(self._create_flake(width, loop_height))
 
-        # Generate frames
+        # Pillow collects all frames before writing the GIF, so generating them lazily does not save memory
+        frames = self._generate_frames(base_image.convert("RGB"), flakes, loop_height)
+        first_frame = next(frames)
+
+        # Quantizing each frame to its own adaptive palette is the most expensive part of saving a GIF,
+        # therefore the palette of the first frame (which already contains snow) is used for all frames
+        palette_image = first_frame.quantize(256)
+
+        # Save as GIF
+        palette_image.save(
+            fp,
+            format="GIF",
+            save_all=True,
+            append_images=(frame.quantize(palette=palette_image, dither=Image.Dither.NONE) for frame in frames),
+            duration=100,  # 100ms per frame
+            loop=0,  # Loop forever
+            optimize=True,
+        )
+
+    def _generate_frames(self, base_image: Image.Image, flakes: List[Tuple], loop_height: int) -> Iterator[Image.Image]:
+        width = base_image.width
         for frame_idx in range(self.num_frames):
             frame = base_image.copy()
-            drawer = ImageDraw.Draw(frame)
 
             # Progress through the animation (0.0 to 1.0)
             progress = frame_idx / self.num_frames
 
             for flake in flakes:
                 start_x, start_y, char, color, total_travel, font_size, x_drift = flake
-                font = secondary_font(font_size)
+                sprite, (offset_x, offset_y) = text_mask(secondary_font(font_size), char)
 
                 # Current y position (wrapping around loop_height)
                 y = (start_y + progress * total_travel) % loop_height - 10
@@ -77,21 +114,10 @@ class SnowAnimation(Animation):
                 # X position with slight drift (also wraps)
                 x = (start_x + progress * x_drift) % width
 
-                # Draw snowflake
-                drawer.text((x, y), char, fill=color, font=font)
-
-            frames.append(frame)
+                # Draw snowflake, using the same integer position as drawing the text would
+                frame.paste(color, (int(x) + offset_x, int(y) + offset_y), sprite)
 
-        # Save as GIF
-        gif_path = path.with_suffix(".gif")
-        frames[0].save(
-            gif_path,
-            save_all=True,
-            append_images=frames[1:],
-            duration=100,  # 100ms per frame
-            loop=0,  # Loop forever
-            optimize=True,
-        )
+            yield frame
 
     def _create_flake(self, width: int, loop_height: int) -> Tuple:
         """Create a snowflake that loops seamlessly.
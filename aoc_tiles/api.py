@@ -0,0 +1,129 @@
+"""Library API to render tiles in memory, e.g. to embed them in a website or dashboard.
+
+Unlike the hook, it needs no repository, README or session cookie and writes no files. The tiles are described by
+TileSpecs and rendered in a pool of worker processes:
+
+    from aoc_tiles.api import TileRenderer, TileSpec, render_config
+    from aoc_tiles.leaderboard import DayScores
+
+    specs = [
+        TileSpec(2023, 1, [".py"], DayScores(time1=754, rank1=1234, score1=0, time2=1322, rank2=87, score2=14)),
+        TileSpec(2023, 2, [".rs", ".py"], stars=1),
+    ]
+    with TileRenderer(render_config(theme="aoc")) as renderer:
+        tiles = renderer.render_tiles(specs)  # Encoded in renderer.image_format, e.g. PNG
+        images = renderer.render_images(specs)  # PIL images of the static tiles
+
+Keep the renderer open to render several batches with the same workers.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+from PIL import Image
+
+from aoc_tiles.colors import extension_to_colors
+from aoc_tiles.config import Config
+from aoc_tiles.drawer import TileDrawer
+from aoc_tiles.leaderboard import DayScores
+from aoc_tiles.render import RenderPool, TileJob, render_tile_in_memory
+
+
+@dataclass
+class TileSpec:
+    """A tile to render. Languages are file extensions like ".py", in the order in which they are shown."""
+
+    year: int
+    day: int
+    languages: List[str] = field(default_factory=list)
+    # Times and ranks of both parts, without them a checkmark is shown for each solved part
+    day_scores: Optional[DayScores] = None
+    stars: int = 2
+
+    def to_job(self) -> TileJob:
+        """Raises a ValueError for extensions without a language color, the leading dot may be omitted."""
+        languages = []
+        for language in self.languages:
+            extension = language if language.startswith(".") else f".{language}"
+            if extension not in extension_to_colors():
+                raise ValueError(f"Unknown language extension '{language}' for day {self.day} of {self.year}")
+            if extension not in languages:
+                languages.append(extension)
+        # The path is only used as the seed of animations, which makes them differ between tiles
+        path = Path(f"{self.year}/{self.day:02}")
+        return TileJob(self.year, self.day, languages, self.day_scores, self.stars, path)
+
+
+def render_config(**options) -> Config:
+    """Returns a config for rendering in memory. The options are Config fields, e.g. theme="aoc".
+
+    Unlike in the hook, times and ranks are shown by default for tiles which have day_scores.
+    """
+    options.setdefault("what_to_show_on_right_side", "time_and_rank")
+    return Config(aoc_dir=None, **options)
+
+
+class TileRenderer:
+    """Renders tiles in memory. Use it as a context manager, which keeps the worker processes alive.
+
+    With processes=1 the tiles are rendered in the current process, which is faster for a few tiles, as starting
+    the workers takes some time. Otherwise the number of processes defaults to the number of CPUs.
+    """
+
+    def __init__(self, config: Optional[Config] = None, processes: Optional[int] = None):
+        self.config = config if config is not None else render_config()
+        self.processes = processes
+        self.render_pool: Optional[RenderPool] = None
+        self.tile_drawer: Optional[TileDrawer] = None
+
+    @property
+    def image_format(self) -> str:
+        """Format of the encoded tiles, animated tiles are GIFs."""
+        return "gif" if self.config.animation != "none" else self.config.image_format
+
+    def __enter__(self) -> "TileRenderer":
+        if self.processes == 1:
+            self.tile_drawer = TileDrawer(self.config)
+        else:
+            self.render_pool = RenderPool(self.config, max_workers=self.processes).__enter__()
+        return self
+
+    def __exit__(self, *args):
+        if self.render_pool is not None:
+            self.render_pool.__exit__(*args)
+        self.render_pool = None
+        self.tile_drawer = None
+
+    def _render(self, specs: Iterable[TileSpec], encode: bool) -> List[Union[bytes, Image.Image]]:
+        if self.render_pool is None and self.tile_drawer is None:
+            raise RuntimeError("TileRenderer must be used as a context manager, e.g. 'with TileRenderer() as r:'")
+        jobs = [spec.to_job() for spec in specs]
+        if self.tile_drawer is not None:
+            return [render_tile_in_memory(job, encode, self.tile_drawer) for job in jobs]
+        futures = [self.render_pool.submit_in_memory(job, encode) for job in jobs]
+        return [future.result() for future in futures]
+
+    def render_tiles(self, specs: Iterable[TileSpec]) -> List[bytes]:
+        """Returns the encoded tiles in the order of the specs, see image_format."""
+        return self._render(specs, encode=True)
+
+    def render_images(self, specs: Iterable[TileSpec]) -> List[Image.Image]:
+        """Returns the static (not animated) tiles as RGB images in the order of the specs."""
+        return self._render(specs, encode=False)
+
+
+def render_tiles(
+    specs: Iterable[TileSpec], config: Optional[Config] = None, processes: Optional[int] = None
+) -> List[bytes]:
+    """Renders a single batch of tiles, see TileRenderer.render_tiles."""
+    with TileRenderer(config, processes) as renderer:
+        return renderer.render_tiles(specs)
+
+
+def render_images(
+    specs: Iterable[TileSpec], config: Optional[Config] = None, processes: Optional[int] = None
+) -> List[Image.Image]:
+    """Renders a single batch of tiles, see TileRenderer.render_images."""
+    with TileRenderer(config, processes) as renderer:
+        return renderer.render_images(specs)
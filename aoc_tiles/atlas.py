@@ -0,0 +1,88 @@
+"""Combines all tiles of a year into a single image (an atlas), linked to the solutions with an HTML image map."""
+
+import io
+import math
+from contextlib import ExitStack
+from pathlib import Path
+from typing import List, Optional
+
+from PIL import Image, ImageSequence
+
+from aoc_tiles.encoding import encode_image
+from aoc_tiles.html import HTML
+from aoc_tiles.writer import write_if_changed
+
+# Tiles per row of the atlas, matching how many tiles GitHub shows per row for the default tile widths
+ATLAS_COLUMNS_PRE_2025 = 5
+ATLAS_COLUMNS_SINCE_2025 = 4
+
+
+def atlas_columns(year: int) -> int:
+    return ATLAS_COLUMNS_SINCE_2025 if year >= 2025 else ATLAS_COLUMNS_PRE_2025
+
+
+def compose_atlas(tile_paths: List[Path], columns: int, path: Path, image_format: str = "png") -> bool:
+    """Pastes the tiles in a grid with the given number of columns and saves it to path.
+
+    Animated tiles result in an animated atlas, where each frame contains the same frame of all tiles.
+    Cells without a tile are transparent. Returns whether the file was written, i.e. its content changed.
+    """
+    with ExitStack() as stack:
+        tiles = [stack.enter_context(Image.open(tile_path)) for tile_path in tile_paths]
+        tile_width, tile_height = tiles[0].size
+        rows = math.ceil(len(tiles) / columns)
+        size = (min(len(tiles), columns) * tile_width, rows * tile_height)
+        num_frames = max(getattr(tile, "n_frames", 1) for tile in tiles)
+        duration = tiles[0].info.get("duration", 100)
+
+        frames = []
+        for frame_idx in range(num_frames):
+            frame = Image.new("RGBA", size, (0, 0, 0, 0))
+            for i, tile in enumerate(tiles):
+                tile_frame = ImageSequence.Iterator(tile)[frame_idx % getattr(tile, "n_frames", 1)]
+                frame.paste(tile_frame.convert("RGBA"), ((i % columns) * tile_width, (i // columns) * tile_height))
+            frames.append(frame)
+
+    if num_frames == 1:
+        return write_if_changed(path, encode_image(frames[0], image_format))
+    file = io.BytesIO()
+    frames[0].save(
+        file,
+        format="GIF",
+        save_all=True,
+        append_images=frames[1:],
+        duration=duration,
+        loop=0,
+        optimize=True,
+    )
+    return write_if_changed(path, file.getvalue())
+
+
+def add_image_map(
+    html: HTML,
+    name: str,
+    atlas_path: Path,
+    solution_hrefs: List[Optional[str]],
+    columns: int,
+    tile_width: int,
+):
+    """Adds the atlas image and an image map with a link for each tile to the html.
+
+    Coordinates of the image map are in displayed pixels, so they are scaled to the tile width.
+    """
+    width = min(len(solution_hrefs), columns) * tile_width
+    html.tag("img", closing=False, src=atlas_path.as_posix(), width=f"{width}px", usemap=f"#{name}")
+    with html.tag("map", name=name):
+        for i, href in enumerate(solution_hrefs):
+            if href is None:
+                continue
+            # Tiles are twice as wide as they are high
+            x, y = (i % columns) * tile_width, (i // columns) * tile_width / 2
+            html.tag(
+                "area",
+                closing=False,
+                shape="rect",
+                coords=f"{x},{round(y)},{x + tile_width},{round(y + tile_width / 2)}",
+                href=href,
+                alt=f"Day {i + 1:02}",
+            )
@@ -0,0 +1,171 @@
+"""Persistent caches stored in the .aoc_tiles/cache directory."""
+
+import dataclasses
+import hashlib
+import json
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from loguru import logger
+
+from aoc_tiles.config import Config
+from aoc_tiles.leaderboard import DayScores
+from aoc_tiles.writer import write_if_changed
+
+
+@lru_cache
+def package_version() -> str:
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:
+        return "unknown"
+    try:
+        return version("aoc-tiles")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _read_json(path: Path) -> Optional[Dict]:
+    if not path.exists():
+        return None
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        logger.warning("Could not read cache file {}, ignoring it", path)
+        return None
+
+
+def _write_json(path: Path, data: Dict):
+    # Unchanged caches keep their mtime, which the RunState fingerprint depends on
+    write_if_changed(path, json.dumps(data, indent=1, sort_keys=True).encode())
+
+
+class TileCache:
+    """Manifest of content fingerprints for each generated tile.
+
+    A tile is only redrawn if the fingerprint of its inputs differs from the one stored in the manifest,
+    or if the tile file does not exist anymore.
+    """
+
+    # Config options which influence how a tile looks
+    CONFIG_FIELDS = [
+        "theme",
+        "animation",
+        "image_format",
+        "what_to_show_on_right_side",
+        "contrast_improvement_type",
+        "contrast_improvement_threshold",
+        "outline_color",
+        "not_completed_color",
+        "top100_color",
+        "text_color",
+    ]
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.manifest_path = Path(config.cache_dir) / "tiles.json"
+        self.fingerprints: Dict[str, str] = _read_json(self.manifest_path) or {}
+        self.config_fingerprint = {name: getattr(config, name) for name in self.CONFIG_FIELDS}
+
+    def _key(self, tile_path: Path) -> str:
+        return Path(tile_path).relative_to(self.config.aoc_dir).as_posix()
+
+    def fingerprint(
+        self,
+        day: int,
+        languages: List[str],
+        day_scores: Union[DayScores, None],
+        stars: int,
+    ) -> str:
+        inputs = {
+            "day": day,
+            "languages": languages,
+            "day_scores": dataclasses.asdict(day_scores) if day_scores is not None else None,
+            "stars": stars,
+            "config": self.config_fingerprint,
+            "version": package_version(),
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def atlas_fingerprint(self, tile_paths: List[Path], columns: int) -> str:
+        """Fingerprint of an atlas, derived from the fingerprints of its tiles, which have to be up to date."""
+        inputs = {
+            "tiles": [self.fingerprints[self._key(tile_path)] for tile_path in tile_paths],
+            "columns": columns,
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def is_up_to_date(self, tile_path: Path, fingerprint: str) -> bool:
+        return tile_path.exists() and self.fingerprints.get(self._key(tile_path)) == fingerprint
+
+    def update(self, tile_path: Path, fingerprint: str):
+        self.fingerprints[self._key(tile_path)] = fingerprint
+
+    def save(self):
+        _write_json(self.manifest_path, self.fingerprints)
+
+
+class DiscoveryIndex:
+    """Persisted result of the solution discovery, so that only changes since the last run are examined.
+
+    When using git, the solution files are reused as long as the git index file is unchanged. Otherwise, the
+    solution files and subdirectories of each directory are stored together with its mtime, which changes
+    whenever an entry is added, removed or renamed in that directory.
+    """
+
+    # Directories modified this recently are not stored, as further changes might not change their mtime
+    RACY_SECONDS = 2
+
+    def __init__(self, config: Config):
+        self.path = Path(config.cache_dir) / "discovery.json"
+        # Changing these options changes which files count as solutions, so the index is discarded
+        key = {"exclude_patterns": config.exclude_patterns, "version": package_version()}
+        self.data = _read_json(self.path)
+        if self.data is None or self.data.get("key") != key:
+            self.data = {"key": key, "git": None, "directories": {}, "years": []}
+        self.visited_directories: Set[str] = set()
+        self.started_ns = time.time_ns()
+
+    def get_git_files(self, index_state: List[int]) -> Optional[List[str]]:
+        git = self.data["git"]
+        if git is not None and git["index_state"] == index_state:
+            return git["files"]
+        return None
+
+    def set_git_files(self, index_state: List[int], files: List[str]):
+        self.data["git"] = {"index_state": index_state, "files": files}
+
+    def get_years(self) -> List[int]:
+        """Years which had solutions in the last run."""
+        return self.data.get("years", [])
+
+    def set_years(self, years: List[int]):
+        self.data["years"] = years
+
+    def get_directory(self, directory: str, mtime_ns: int) -> Optional[Tuple[List[str], List[str]]]:
+        """Returns the solution files and subdirectories of the directory, if it is unchanged."""
+        self.visited_directories.add(directory)
+        entry = self.data["directories"].get(directory)
+        if entry is not None and entry["mtime_ns"] == mtime_ns:
+            return entry["files"], entry["subdirectories"]
+        return None
+
+    def set_directory(self, directory: str, mtime_ns: int, files: List[str], subdirectories: List[str]):
+        if self.started_ns - mtime_ns < self.RACY_SECONDS * 10**9:
+            self.data["directories"].pop(directory, None)
+            return
+        self.data["directories"][directory] = {
+            "mtime_ns": mtime_ns,
+            "files": files,
+            "subdirectories": subdirectories,
+        }
+
+    def save(self):
+        if self.visited_directories:
+            # Forget directories which do not exist anymore
+            directories = self.data["directories"]
+            self.data["directories"] = {d: directories[d] for d in self.visited_directories if d in directories}
+        _write_json(self.path, self.data)
@@ -1,14 +1,12 @@
 import argparse
 import dataclasses
 import functools
+import sys
 from dataclasses import fields
 from pathlib import Path
-from typing import Literal, get_args, List, get_origin
+from typing import Literal, Optional, get_args, List, get_origin
 
-import rich.traceback
-
-from aoc_tiles.config import Config
-from aoc_tiles.make_tiles import TileMaker
+from aoc_tiles.run_state import RunState
 
 
 def literal_or_error(value, literal_type: type):
@@ -41,7 +39,7 @@ def type_for_field(field):
     return field.type
 
 
-def cli_parse_config(datacls):
+def cli_parse_config(datacls, args: Optional[List[str]] = None):
     parser = argparse.ArgumentParser(description="CLI for Config dataclass")
     for field in fields(datacls):
         if field.init:
@@ -75,15 +73,55 @@ def cli_parse_config(datacls):
         " and we don't want to fail the hook because of that.",
     )
 
-    args = vars(parser.parse_args())
-    del args["positional args are ignored"]
-    return datacls(**args)
+    parsed_args = vars(parser.parse_args(args))
+    del parsed_args["positional args are ignored"]
+    return datacls(**parsed_args)
 
 
 def main():
+    # Heavy modules are only imported if there is something to do, as this runs on every commit
+    run_state = RunState(sys.argv[1:])
+    # When profiling, the run is always done, as there is nothing to measure otherwise
+    is_run_forced = "--profile" in sys.argv or "--watch" in sys.argv
+    if not is_run_forced and run_state.is_up_to_date():
+        print("AoC-Tiles: tiles and README are up to date, nothing to do.")
+        return
+
+    if run_state.is_running():
+        # E.g. the post-commit hook runs again while the tiles are amended to the commit, which must not wait for
+        # the daemon, as the daemon waits for this hook
+        print("AoC-Tiles is already running! Remove running.lock if this is not the case.")
+        return
+
+    if "--watch" not in sys.argv and "--daemon" not in sys.argv:
+        from aoc_tiles.daemon import request_run
+
+        exit_code = request_run(sys.argv[1:], run_state.cache_dir)
+        if exit_code is not None:
+            if exit_code != 0:
+                sys.exit(exit_code)
+            run_state.save()
+            return
+
+    import rich.traceback
+
+    from aoc_tiles.config import Config
+    from aoc_tiles.make_tiles import TileMaker
+
     rich.traceback.install()
     config = cli_parse_config(Config)
+    if config.daemon:
+        from aoc_tiles.daemon import serve
+
+        serve(config)
+        return
+    if config.watch:
+        from aoc_tiles.watch import watch
+
+        watch(TileMaker(config))
+        return
     TileMaker(config).make_tiles()
+    run_state.save()
 
 
 if __name__ == "__main__":
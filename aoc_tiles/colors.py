@@ -1,12 +1,15 @@
 # Location of yaml file where file extensions are mapped to colors
+import json
 from functools import lru_cache
 from pathlib import Path
-from typing import Tuple, Dict
+from typing import Tuple, Dict, List, Optional
 
-import yaml
 from loguru import logger
 
 GITHUB_LANGUAGES_PATH = Path(__file__).parent / "resources" / "github_languages.yaml"
+# Table generated from the yaml file above, as parsing the yaml is slow. Regenerate it with:
+# python -m aoc_tiles.colors
+LANGUAGES_TABLE_PATH = Path(__file__).parent / "resources" / "languages.json"
 
 # Until someone complains, I'll exclude languages which conflict with my language extensions
 excludes = ["GCC Machine Description", "Standard ML"]
@@ -15,6 +18,8 @@ overrides = {"Jupyter Notebook": {"type": "programming"}}
 
 @lru_cache
 def github_languages_config() -> Dict[str, Dict]:
+    import yaml
+
     with open(GITHUB_LANGUAGES_PATH) as file:
         logger.debug("Loading github_languages.yaml from {}", GITHUB_LANGUAGES_PATH)
         yaml_loader = yaml.CLoader if yaml.__with_libyaml__ else yaml.Loader
@@ -31,26 +36,54 @@ def github_languages_config() -> Dict[str, Dict]:
         return github_languages
 
 
-@lru_cache
-def extension_to_colors() -> Dict[str, str]:
+def build_language_table() -> Dict[str, List]:
+    """Maps each extension to [language, color, rgb, luminance], where the last three are None without a color."""
+    from PIL import ImageColor
+
     extension_to_color = {}
+    extension_to_language = {}
     for language, data in github_languages_config().items():
-        if "color" in data and "extensions" in data and data["type"] == "programming" and language not in excludes:
+        if "extensions" in data and data["type"] == "programming" and language not in excludes:
             for extension in data["extensions"]:
-                extension_to_color[extension.lower()] = data["color"]
+                extension_to_language[extension.lower()] = language
+                if "color" in data:
+                    extension_to_color[extension.lower()] = data["color"]
 
-    return extension_to_color
+    table = {}
+    for extension, language in sorted(extension_to_language.items()):
+        color = extension_to_color.get(extension)
+        rgb = ImageColor.getrgb(color)[:3] if color is not None else None
+        table[extension] = [language, color, rgb, luminance(rgb) if rgb is not None else None]
+    return table
 
 
 @lru_cache
-def extension_to_programming_language() -> Dict[str, str]:
-    extension_to_language = {}
-    for language, data in github_languages_config().items():
-        if "extensions" in data and data["type"] == "programming" and language not in excludes:
-            for extension in data["extensions"]:
-                extension_to_language[extension.lower()] = language
+def language_table() -> Dict[str, List]:
+    if not LANGUAGES_TABLE_PATH.exists():
+        logger.warning("{} is missing, falling back to parsing the yaml file", LANGUAGES_TABLE_PATH)
+        return build_language_table()
+    with open(LANGUAGES_TABLE_PATH) as file:
+        return json.load(file)
+
+
+@lru_cache
+def extension_to_colors() -> Dict[str, str]:
+    return {extension: entry[1] for extension, entry in language_table().items() if entry[1] is not None}
+
+
+@lru_cache
+def extension_to_rgb() -> Dict[str, Tuple[int, int, int]]:
+    return {extension: tuple(entry[2]) for extension, entry in language_table().items() if entry[2] is not None}
+
 
-    return extension_to_language
+@lru_cache
+def extension_to_luminance() -> Dict[str, float]:
+    return {extension: entry[3] for extension, entry in language_table().items() if entry[3] is not None}
+
+
+@lru_cache
+def extension_to_programming_language() -> Dict[str, str]:
+    return {extension: entry[0] for extension, entry in language_table().items()}
 
 
 def darker_color(c: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
@@ -63,5 +96,17 @@ def luminance(color):
 
 
 # How similar is color_a to color_b
-def color_similarity(color_a, color_b, threshold):
-    return abs(luminance(color_a) - luminance(color_b)) < threshold
+def color_similarity(color_a, color_b, threshold, *, luminance_a: Optional[float] = None):
+    luminance_a = luminance(color_a) if luminance_a is None else luminance_a
+    return abs(luminance_a - luminance(color_b)) < threshold
+
+
+def main():
+    table = build_language_table()
+    with open(LANGUAGES_TABLE_PATH, "w") as file:
+        json.dump(table, file, separators=(",", ":"), sort_keys=True)
+    print(f"Wrote {len(table)} extensions to {LANGUAGES_TABLE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import re
 import sys
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -13,7 +14,7 @@ TILE_WIDTH_SINCE_2025 = "203px"
 
 @dataclass
 class Config:
-    aoc_dir: Union[str, Path] = field(
+    aoc_dir: Union[str, Path, None] = field(
         default="./", metadata={"help": "Path to the AoC directory.", "type": str}
     )
     readme_path: Union[str, Path] = field(init=False)
@@ -26,6 +27,29 @@ class Config:
         default=0,
         metadata={"help": "Debug information level: 1=INFO, 2=DEBUG, 3=TRACE."},
     )
+    watch: bool = field(
+        default=False,
+        metadata={
+            "help": "Keep running and update the tiles and README whenever solutions are added, removed or, if "
+            "only solutions in git are used, git added. Only the tiles of changed days are drawn again. Commits are "
+            "never amended in this mode, 'amend' for --auto-add-tiles-to-git only adds the tiles to git."
+        },
+    )
+    daemon: bool = field(
+        default=False,
+        metadata={
+            "help": "Run a daemon for this repository, which keeps Python, the fonts and the render workers loaded. "
+            "While it runs, the hook hands its work to the daemon, which makes it a lot faster. Start it in the "
+            "background, e.g. with 'aoc-tiles --daemon &'. Needs Unix sockets, i.e. Linux or macOS."
+        },
+    )
+    profile: bool = field(
+        default=False,
+        metadata={
+            "help": "Measure how long each stage and each tile takes. Prints the slowest ones and writes a trace "
+            "to .aoc_tiles/cache/profile.json, which can be opened in https://ui.perfetto.dev or chrome://tracing."
+        },
+    )
 
     theme: Literal["modern", "aoc"] = field(
         default="modern",
@@ -45,6 +69,16 @@ class Config:
         },
     )
 
+    image_format: Literal["png", "webp"] = field(
+        default="png",
+        metadata={
+            "help": "Image format of static tiles, both are lossless. "
+            "'png' is supported everywhere. "
+            "'webp' is around a third smaller, however some older image viewers cannot open it. "
+            "Animated tiles are always GIFs."
+        },
+    )
+
     what_to_show_on_right_side: Literal["auto", "checkmark", "time_and_rank", "loc"] = (
         field(
             default="auto",
@@ -120,7 +154,8 @@ class Config:
         metadata={
             "help": "A list of comma separated glob patterns to ignore when looking for solutions. "
             "Listing the paths works too. "
-            "For example: '*.py,*.js', '2023/05/05.c' or '2021/**.py'."
+            "For example: '*.py,*.js', '2023/05/05.c' or '2021/**.py'. "
+            "A pattern matching a directory excludes everything inside it, e.g. 'build' or '2021/*/venv'. "
             "Make sure to escape the patterns with single quotes when running from the shell! "
             "Do NOT escape them when using the flag in the yaml! "
             "Otherwise the qoute will be part of the pattern."
@@ -177,7 +212,61 @@ class Config:
         },
     )
 
+    output_images: Literal["tiles", "atlas"] = field(
+        default="tiles",
+        metadata={
+            "help": "How the tiles are written to the README. "
+            "'tiles' creates one image per day. "
+            "'atlas' combines all tiles of a year into a single image, which is linked to the solutions "
+            "with an HTML image map. This results in a lot fewer files and requests, however not every "
+            "markdown renderer supports image maps, in which case the tiles are shown but not clickable. "
+            "The atlas needs the tile width in pixels."
+        },
+    )
+
     def __post_init__(self):
+        if self.aoc_dir is None:
+            # Only for rendering tiles in memory, which needs no repository and writes no files, see aoc_tiles.api
+            self.readme_path = self.aoc_tiles_dir = self.running_lock_path = None
+            self.session_cookie_path = self.image_dir = self.cache_dir = None
+        else:
+            self._set_repository_paths()
+
+        has_session_cookie = self.session_cookie_path is not None and self.session_cookie_path.exists()
+        if self.count_as_solved_when == "auto":
+            self.count_as_solved_when = "both" if has_session_cookie else "file_exists"
+
+        if self.what_to_show_on_right_side == "auto":
+            self.what_to_show_on_right_side = "time_and_rank" if has_session_cookie else "checkmark"
+
+        self.outline_color = ImageColor.getrgb(self.outline_color)
+        self.not_completed_color = ImageColor.getrgb(self.not_completed_color)
+        self.text_color = ImageColor.getrgb(self.text_color)
+        self.top100_color = ImageColor.getrgb(self.top100_color)
+
+        if self.output_images == "atlas" and not re.fullmatch(r"auto|\d+(px)?", self.tile_width_px):
+            sys.exit(
+                f"[ERROR] The atlas needs a tile width in pixels, e.g. '{TILE_WIDTH_PRE_2025}', "
+                f"but tile_width_px is '{self.tile_width_px}'. Use output_images=tiles for other widths."
+            )
+
+        for i, suffix in enumerate(self.language_sorting):
+            if not suffix.startswith("."):
+                self.language_sorting[i] = "." + suffix
+
+        # Rendering in memory is used as a library, which configures logging itself
+        if self.aoc_dir is not None:
+            self.configure_logger()
+            logger.debug(self)
+
+    def configure_logger(self):
+        """Logs to the current stderr with the level of the verbosity, nothing is logged with a verbosity of 0."""
+        logger.remove()
+        if self.verbosity > 0:
+            level = [None, "INFO", "DEBUG", "TRACE"][min(self.verbosity, 3)]
+            logger.add(sys.stderr, level=level)
+
+    def _set_repository_paths(self):
         self.aoc_dir = Path(self.aoc_dir)
 
         if not hasattr(self, "readme_path"):
@@ -212,29 +301,3 @@ class Config:
 
         if not hasattr(self, "cache_dir"):
             self.cache_dir = self.aoc_tiles_dir / "cache"
-
-        if self.count_as_solved_when == "auto":
-            self.count_as_solved_when = (
-                "both" if self.session_cookie_path.exists() else "file_exists"
-            )
-
-        if self.what_to_show_on_right_side == "auto":
-            self.what_to_show_on_right_side = (
-                "time_and_rank" if self.session_cookie_path.exists() else "checkmark"
-            )
-
-        self.outline_color = ImageColor.getrgb(self.outline_color)
-        self.not_completed_color = ImageColor.getrgb(self.not_completed_color)
-        self.text_color = ImageColor.getrgb(self.text_color)
-        self.top100_color = ImageColor.getrgb(self.top100_color)
-
-        for i, suffix in enumerate(self.language_sorting):
-            if not suffix.startswith("."):
-                self.language_sorting[i] = "." + suffix
-
-        logger.remove()
-        if self.verbosity > 0:
-            level = [None, "INFO", "DEBUG", "TRACE"][min(self.verbosity, 3)]
-            logger.add(sys.stderr, level=level)
-
-        logger.debug(self)
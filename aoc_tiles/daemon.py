@@ -0,0 +1,275 @@
+"""Background daemon which keeps everything loaded, so that hook runs only pay for the tiles which changed.
+
+Start it in the repository with `aoc-tiles --daemon`. The hook then sends its arguments over a Unix socket in the
+cache directory, and the daemon does the run with its warm render workers and sends the output back. If no daemon
+is running, or it runs an older version of the package, the hook runs in its own process as usual.
+
+The client part of this module only uses the standard library, as it runs before the heavy modules are imported.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import traceback
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+from aoc_tiles.run_state import package_state
+
+if TYPE_CHECKING:
+    from aoc_tiles.config import Config
+    from aoc_tiles.render import RenderPool
+
+# Unix socket paths are limited to around 100 bytes, longer paths are replaced by one in the temp directory
+MAX_SOCKET_PATH_LENGTH = 100
+CONNECT_TIMEOUT_SECONDS = 0.5
+# The hook stops waiting and runs without the daemon if the daemon sends nothing for this long
+READ_TIMEOUT_SECONDS = 120
+# How often the daemon checks whether the current request is done, while it rejects other requests
+BUSY_POLL_SECONDS = 0.1
+
+
+def socket_path(cache_dir: Path) -> Path:
+    path = Path(cache_dir).resolve() / "daemon.sock"
+    if len(str(path)) <= MAX_SOCKET_PATH_LENGTH:
+        return path
+    digest = hashlib.sha256(str(path).encode()).hexdigest()[:16]
+    return Path(tempfile.gettempdir()) / f"aoc-tiles-{digest}.sock"
+
+
+def _connect(path: Path) -> socket.socket:
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(CONNECT_TIMEOUT_SECONDS)
+        client.connect(str(path))
+        client.settimeout(None)
+    except OSError:
+        client.close()
+        raise
+    return client
+
+
+def _send(connection: socket.socket, message: Dict):
+    connection.sendall((json.dumps(message) + "\n").encode())
+
+
+def request_run(args: List[str], cache_dir: Path) -> Optional[int]:
+    """Lets the daemon of the repository do the run. Returns its exit code, or None if there is no usable daemon."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = socket_path(cache_dir)
+    if not path.exists():
+        return None
+    try:
+        with _connect(path) as client:
+            _send(
+                client,
+                {
+                    "args": args,
+                    "cwd": os.getcwd(),
+                    # The hook may run with a different index or work tree, e.g. GIT_INDEX_FILE
+                    "git_environment": {key: value for key, value in os.environ.items() if key.startswith("GIT_")},
+                    "package_state": package_state(),
+                },
+            )
+            client.settimeout(READ_TIMEOUT_SECONDS)
+            for line in client.makefile("r", encoding="utf-8"):
+                message = json.loads(line)
+                if "output" in message:
+                    sys.stdout.write(message["output"])
+                    sys.stdout.flush()
+                elif "exit_code" in message:
+                    return message["exit_code"]
+                elif "error" in message:
+                    print(f"AoC-Tiles daemon: {message['error']}, running without it.")
+                    return None
+    except socket.timeout:
+        print(f"AoC-Tiles daemon: no response for {READ_TIMEOUT_SECONDS} seconds, running without it.")
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class _OutputWriter(io.TextIOBase):
+    """Sends everything written to it to the client, used as stdout and stderr while handling a request."""
+
+    def __init__(self, connection: socket.socket):
+        self.connection = connection
+
+    def write(self, text: str) -> int:
+        if text:
+            _send(self.connection, {"output": text})
+        return len(text)
+
+
+@contextlib.contextmanager
+def _git_environment(environment: Dict[str, str]) -> Iterator[None]:
+    previous = dict(os.environ)
+    for key in [key for key in os.environ if key.startswith("GIT_")]:
+        del os.environ[key]
+    os.environ.update(environment)
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(previous)
+
+
+class Daemon:
+    """Handles the runs of a single repository, one at a time, keeping the render pool alive between them."""
+
+    def __init__(self, config: "Config"):
+        from aoc_tiles.colors import extension_to_colors
+
+        self.config = config
+        self.path = socket_path(config.cache_dir)
+        self.render_pool: Optional["RenderPool"] = None
+        self.server: Optional[socket.socket] = None
+        # Connection of the request which is currently handled
+        self.connection: Optional[socket.socket] = None
+        self.package_state = package_state()
+        extension_to_colors()
+        os.register_at_fork(after_in_child=self._close_sockets)
+
+    def _close_sockets(self):
+        # Forked render workers would otherwise keep the sockets open, only their copies are closed
+        for sock in (self.server, self.connection):
+            if sock is not None:
+                sock.close()
+
+    def _get_render_pool(self, config: "Config") -> "RenderPool":
+        from aoc_tiles.render import RenderPool
+
+        # Workers are initialized with the config, so a different config needs new workers
+        if self.render_pool is not None and self.render_pool.config != config:
+            self.render_pool.__exit__(None, None, None)
+            self.render_pool = None
+        if self.render_pool is None:
+            # The workers are forked right away, without the redirection to the connection of the current request
+            with contextlib.redirect_stdout(sys.__stdout__), contextlib.redirect_stderr(sys.__stderr__):
+                self.render_pool = RenderPool(config).__enter__()
+                self.render_pool.start_workers()
+        return self.render_pool
+
+    def _run(self, args: List[str]) -> int:
+        from aoc_tiles.cli import cli_parse_config
+        from aoc_tiles.config import Config
+        from aoc_tiles.make_tiles import TileMaker
+
+        try:
+            config = cli_parse_config(Config, args)
+            render_pool = self._get_render_pool(config)
+            tile_maker = TileMaker(config)
+            tile_maker.render_pool = render_pool
+            tile_maker.make_tiles()
+        except SystemExit as error:
+            if error.code is None or isinstance(error.code, int):
+                return error.code or 0
+            print(error.code, file=sys.stderr)
+            return 1
+        except Exception:
+            traceback.print_exc()
+            return 1
+        return 0
+
+    def handle(self, connection: socket.socket) -> bool:
+        """Handles a single request. Returns False if the daemon should stop."""
+        line = connection.makefile("r", encoding="utf-8").readline()
+        if not line:
+            # Only checked whether the daemon is running
+            return True
+        request = json.loads(line)
+        if request["package_state"] != self.package_state:
+            _send(connection, {"error": "the daemon is outdated and stops, restart it"})
+            return False
+        if Path(request["cwd"]).resolve() != Path.cwd().resolve():
+            _send(connection, {"error": f"the daemon serves {Path.cwd()}"})
+            return True
+        writer = _OutputWriter(connection)
+        with self._rejecting_other_requests(), _git_environment(request["git_environment"]):
+            with contextlib.redirect_stdout(writer), contextlib.redirect_stderr(writer):
+                exit_code = self._run(request["args"])
+        _send(connection, {"exit_code": exit_code})
+        return True
+
+    def _reject_while_busy(self, done: threading.Event):
+        while not done.is_set():
+            if not select.select([self.server], [], [], BUSY_POLL_SECONDS)[0]:
+                continue
+            try:
+                connection, _ = self.server.accept()
+                with connection:
+                    # The request is read first, as the client only reads the answer after sending it
+                    connection.settimeout(CONNECT_TIMEOUT_SECONDS)
+                    connection.makefile("r", encoding="utf-8").readline()
+                    _send(connection, {"error": "the daemon is busy with another run"})
+            except OSError:
+                pass
+
+    @contextlib.contextmanager
+    def _rejecting_other_requests(self) -> Iterator[None]:
+        """Answers all other requests with an error until the current one is done.
+
+        Otherwise, they would wait in the backlog, which deadlocks if the current run waits for them, e.g. when
+        amending the commit runs the post-commit hook again.
+        """
+        done = threading.Event()
+        rejecter = threading.Thread(target=self._reject_while_busy, args=(done,), daemon=True)
+        rejecter.start()
+        try:
+            yield
+        finally:
+            done.set()
+            rejecter.join()
+
+    def serve(self):
+        if self.path.exists():
+            try:
+                _connect(self.path).close()
+                sys.exit(f"[ERROR] A daemon is already running at {self.path}")
+            except OSError:
+                # Left over from a daemon which did not exit cleanly
+                self.path.unlink()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            self.server = server
+            server.bind(str(self.path))
+            os.chmod(self.path, 0o600)
+            server.listen()
+            print(f"AoC-Tiles daemon is listening at {self.path}, press Ctrl+C to stop")
+            # Stop cleanly when killed, like with Ctrl+C
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+            try:
+                while True:
+                    connection, _ = server.accept()
+                    with connection:
+                        self.connection = connection
+                        try:
+                            if not self.handle(connection):
+                                break
+                        except (OSError, ValueError, KeyError) as error:
+                            print(f"Could not handle request: {error!r}")
+                        finally:
+                            self.connection = None
+            except KeyboardInterrupt:
+                pass
+            finally:
+                if self.path.exists():
+                    self.path.unlink()
+                if self.render_pool is not None:
+                    self.render_pool.__exit__(None, None, None)
+        print("AoC-Tiles daemon stopped")
+
+
+def serve(config: "Config"):
+    if not hasattr(socket, "AF_UNIX"):
+        sys.exit("[ERROR] The daemon needs Unix sockets, which are not available on this system")
+    Daemon(config).serve()
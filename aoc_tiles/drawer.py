@@ -1,44 +1,94 @@
 """Tile drawing module - delegates to theme and animation systems."""
 
+import io
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Union
+from typing import BinaryIO, List, Union
 
 from PIL import Image
 
 from aoc_tiles.animations import get_animation
 from aoc_tiles.config import Config
+from aoc_tiles.encoding import default_encoded_size, encode_image
+from aoc_tiles.glyphs import load_text_masks
 from aoc_tiles.leaderboard import DayScores
+from aoc_tiles.profiler import profiler
 from aoc_tiles.themes import get_theme, Theme
+from aoc_tiles.writer import write_if_changed
+
+
+@dataclass
+class DrawnTile:
+    path: Path
+    # Compared to a PNG with the Pillow defaults, only measured with --profile
+    bytes_saved: int
+    # False if the file already had the same content
+    written: bool
 
 
 class TileDrawer:
-    """Draws tiles using the configured theme and optional animation."""
+    """Draws tiles using the configured theme and optional animation.
+
+    Drawing happens in stages: render_tile draws the static tile in memory, encode_tile applies the
+    animation and encodes it, and draw_tile combines both to write the tile to a file.
+    """
 
     def __init__(self, config: Config):
         self.config = config
         self.theme: Theme = get_theme(config)
         self.animation = get_animation(config)
+        if config.cache_dir is not None:
+            common_texts = self.theme.common_texts() + (self.animation.common_texts() if self.animation else [])
+            load_text_masks(config.cache_dir, common_texts)
 
-    def draw_tile(
+    def render_tile(
         self,
         day: str,
         languages: List[str],
         day_scores: Union[DayScores, None],
-        path: Path,
         stars: int,
-    ):
-        """Saves a graphic for a given day and year. Returns the path to it."""
-        if self.animation:
-            # For animations, we need the base image first
-            # Create a temporary path for the base image
-            temp_path = path.with_suffix(".tmp.png")
-            self.theme.draw_tile(day, languages, day_scores, temp_path, stars)
+    ) -> Image.Image:
+        """Returns the static (not animated) tile as an image."""
+        return self.theme.render_tile(day, languages, day_scores, stars)
 
-            # Load the base image and create animation
-            base_image = Image.open(temp_path)
-            self.animation.animate(base_image, path)
+    def encode_tile(self, image: Image.Image, fp: Union[Path, BinaryIO], seed: str) -> int:
+        """Writes the tile to a path or file object, as GIF if animated, otherwise in the configured image format.
 
-            # Clean up temp file
-            temp_path.unlink()
+        The seed makes animations unique per tile, usually it is the path of the tile. With --profile, returns the
+        number of bytes saved compared to a PNG with the Pillow defaults, otherwise 0, as it needs a second encoding.
+        """
+        if self.animation:
+            self.animation.save(image, fp, seed=seed)
+            return 0
+        data = encode_image(image, self.config.image_format)
+        if isinstance(fp, Path):
+            fp.write_bytes(data)
         else:
-            self.theme.draw_tile(day, languages, day_scores, path, stars)
+            fp.write(data)
+        return default_encoded_size(image) - len(data) if self.config.profile else 0
+
+    def encode_tile_to_bytes(self, image: Image.Image, seed: str) -> bytes:
+        """Same as encode_tile, but returns the encoded tile."""
+        file = io.BytesIO()
+        self.encode_tile(image, file, seed=seed)
+        return file.getvalue()
+
+    def draw_tile(
+        self,
+        day: str,
+        languages: List[str],
+        day_scores: Union[DayScores, None],
+        path: Path,
+        stars: int,
+    ) -> DrawnTile:
+        """Saves a graphic for a given day and year, unless the file already has the same content."""
+        if self.animation:
+            path = path.with_suffix(".gif")
+        with profiler.span("render", "tile_stage", tile=str(path)):
+            image = self.render_tile(day, languages, day_scores, stars)
+        file = io.BytesIO()
+        with profiler.span("encode", "tile_stage", tile=str(path)):
+            bytes_saved = self.encode_tile(image, file, seed=str(path))
+        with profiler.span("write", "tile_stage", tile=str(path)):
+            written = write_if_changed(path, file.getvalue())
+        return DrawnTile(path, bytes_saved, written)
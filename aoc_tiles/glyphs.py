@@ -0,0 +1,107 @@
+"""Cache of rasterized text, so that strings which are on many tiles are only rendered once by FreeType.
+
+Texts are pasted through their cached masks, which gives exactly the same pixels as ImageDraw.text for a single
+line of text at an integer position. The masks of the texts which are on most tiles (e.g. "Day" or the day numbers)
+are persisted in the cache directory, so that new render workers do not have to rasterize them again.
+"""
+
+import base64
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import PIL
+from PIL import Image, ImageDraw, ImageFont
+
+from aoc_tiles.cache import package_version
+from aoc_tiles.writer import write_if_changed
+
+# Mask of a text and the offset of its top left corner to the text position
+TextMask = Tuple[Image.Image, Tuple[int, int]]
+# Font file name, font size, text and stroke width
+MaskKey = Tuple[str, int, str, int]
+
+# Masks loaded from the cache directory, see load_text_masks
+_persisted_masks: Dict[MaskKey, TextMask] = {}
+
+
+def _mask_key(font: ImageFont.FreeTypeFont, text: str, stroke_width: int) -> MaskKey:
+    return Path(font.path).name, font.size, text, stroke_width
+
+
+@lru_cache(maxsize=4096)
+def _rasterize(font: ImageFont.FreeTypeFont, text: str, stroke_width: int) -> TextMask:
+    # Same call as in ImageDraw.text, the stroke mask is separate from the mask of the text itself
+    mask, offset = font.getmask2(text, "L", stroke_width=stroke_width)
+    return Image.Image()._new(mask), offset
+
+
+def text_mask(font: ImageFont.FreeTypeFont, text: str, stroke_width: int = 0) -> TextMask:
+    """Returns the mask of the text, rasterizing it only if it is neither persisted nor cached in memory."""
+    persisted = _persisted_masks.get(_mask_key(font, text, stroke_width))
+    if persisted is not None:
+        return persisted
+    return _rasterize(font, text, stroke_width)
+
+
+def text_bbox(xy: Tuple[int, int], text: str, font: ImageFont.FreeTypeFont) -> Tuple[int, int, int, int]:
+    """Same as ImageDraw.textbbox for a single line of text."""
+    mask, (left, top) = text_mask(font, text)
+    return xy[0] + left, xy[1] + top, xy[0] + left + mask.width, xy[1] + top + mask.height
+
+
+def draw_text(
+    drawer: ImageDraw.ImageDraw,
+    xy: Tuple[int, int],
+    text: str,
+    fill,
+    font: ImageFont.FreeTypeFont,
+    stroke_width: int = 0,
+    stroke_fill=None,
+):
+    """Same as ImageDraw.text for a single line of text at an integer position, but pastes cached masks."""
+    if stroke_width:
+        stroke_mask, (left, top) = text_mask(font, text, stroke_width)
+        drawer.bitmap((xy[0] + left, xy[1] + top), stroke_mask, fill=fill if stroke_fill is None else stroke_fill)
+    mask, (left, top) = text_mask(font, text)
+    drawer.bitmap((xy[0] + left, xy[1] + top), mask, fill=fill)
+
+
+def _encode_mask(key: MaskKey, masked_text: TextMask) -> Dict:
+    mask, offset = masked_text
+    return {
+        "key": list(key),
+        "offset": list(offset),
+        "size": list(mask.size),
+        "data": base64.b64encode(mask.tobytes()).decode(),
+    }
+
+
+def _decode_mask(entry: Dict) -> Tuple[MaskKey, TextMask]:
+    mask = Image.frombytes("L", tuple(entry["size"]), base64.b64decode(entry["data"]))
+    return tuple(entry["key"]), (mask, tuple(entry["offset"]))
+
+
+def load_text_masks(cache_dir: Path, texts: Iterable[Tuple[ImageFont.FreeTypeFont, str, int]]):
+    """Loads the masks of the texts (font, text, stroke width) from the cache directory.
+
+    If they were not persisted yet, they are rasterized and saved. The file depends on the Pillow version, as
+    FreeType may rasterize differently.
+    """
+    keyed_texts: Dict[MaskKey, Tuple[ImageFont.FreeTypeFont, str, int]] = {
+        _mask_key(*text): text for text in texts
+    }
+    digest = hashlib.sha256(repr((sorted(keyed_texts), package_version(), PIL.__version__)).encode()).hexdigest()
+    path = Path(cache_dir) / "text_masks" / f"masks-{digest[:16]}.json"
+    entries: Optional[List[Dict]] = None
+    if path.exists():
+        try:
+            entries = json.loads(path.read_text())
+        except ValueError:
+            entries = None
+    if entries is None:
+        entries = [_encode_mask(key, _rasterize(*text)) for key, text in keyed_texts.items()]
+        write_if_changed(path, json.dumps(entries).encode())
+    _persisted_masks.update(_decode_mask(entry) for entry in entries)
@@ -1,28 +1,48 @@
-import itertools
+import json
 import re
 import time
-from dataclasses import dataclass, fields
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import astuple, dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Union, Dict
+from typing import Dict, Iterable, Optional, Union
 
 from loguru import logger
 import requests
 
 from aoc_tiles.config import Config
+from aoc_tiles.profiler import profiler
+from aoc_tiles.run_state import days_in_year
+from aoc_tiles.writer import write_if_changed
 
 # URL for the personal leaderboard (same for everyone)
 PERSONAL_LEADERBOARD_URL = "https://adventofcode.com/{year}/leaderboard/self"
+USER_AGENT = "https://github.com/LiquidFun/aoc_tiles by Brutenis Gliwa"
+# Maximum number of leaderboards which are downloaded at the same time
+MAX_PARALLEL_REQUESTS = 4
+# Times above 24 hours are only shown as ">24h" on the leaderboard
+MAX_TIME_SECONDS = 24 * 60 * 60
+# Increase when the format of the parsed leaderboard cache changes
+PARSED_LEADERBOARD_VERSION = 1
 
 
 @dataclass
 class DayScores:
-    time1: Union[str, None] = None
-    rank1: Union[str, None] = None
-    score1: Union[str, None] = None
-    time2: Union[str, None] = None
-    rank2: Union[str, None] = None
-    score2: Union[str, None] = None
+    """Scores of both parts of a day, times are in seconds."""
+
+    time1: Union[int, None] = None
+    rank1: Union[int, None] = None
+    score1: Union[int, None] = None
+    time2: Union[int, None] = None
+    rank2: Union[int, None] = None
+    score2: Union[int, None] = None
+
+
+def _parse_time(time_str: str) -> int:
+    if ">" in time_str.replace("&gt;", ">"):
+        return MAX_TIME_SECONDS
+    h, m, s = time_str.split(":")
+    return int(h) * 3600 + int(m) * 60 + int(s)
 
 
 def _parse_leaderboard(leaderboard_path: Path) -> Dict[int, DayScores]:
@@ -49,17 +69,44 @@ def _parse_leaderboard(leaderboard_path: Path) -> Dict[int, DayScores]:
             # replace "-" with None to be able to handle the data later, like if no score existed for the day
             scores = [s if s != "-" else None for s in scores]
             assert len(scores) in (3, 6), f"Number scores for {day=} ({scores}) are not 3 or 6."
+            # Every third value is a time, the others are ranks and scores
+            scores = [
+                None if s is None else _parse_time(s) if i % 3 == 0 else int(s) for i, s in enumerate(scores)
+            ]
             day_to_scores[int(day)] = DayScores(*scores)
         return day_to_scores
 
 
+def _load_leaderboard(leaderboard_path: Path) -> Dict[int, DayScores]:
+    """Loads the leaderboard from the parsed cache next to the HTML file, parsing the HTML only if it changed."""
+    parsed_path = leaderboard_path.with_suffix(".json")
+    stat = leaderboard_path.stat()
+    source = {"version": PARSED_LEADERBOARD_VERSION, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    if parsed_path.exists():
+        try:
+            with open(parsed_path) as file:
+                parsed = json.load(file)
+            if parsed["source"] == source:
+                return {int(day): DayScores(*scores) for day, scores in parsed["days"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.warning("Could not read parsed leaderboard {}, parsing the HTML instead", parsed_path)
+
+    day_to_scores = _parse_leaderboard(leaderboard_path)
+    days = {day: list(astuple(scores)) for day, scores in day_to_scores.items()}
+    # Written atomically, as RunState reads it to check whether the leaderboard is complete
+    write_if_changed(parsed_path, json.dumps({"source": source, "days": days}).encode())
+    return day_to_scores
+
+
 def _is_year_already_unlocked(year: int) -> bool:
     unlock_time = datetime(year, 12, 1, 5, 0, tzinfo=timezone.utc)
     curr_time = datetime.now(timezone.utc)
     return unlock_time <= curr_time
 
 
-def request_leaderboard(year: int, config: Config) -> Dict[int, DayScores]:
+def request_leaderboard(
+    year: int, config: Config, session: Optional[requests.Session] = None
+) -> Dict[int, DayScores]:
     leaderboard_path = config.cache_dir / f"leaderboard{year}.html"
 
     if not _is_year_already_unlocked(year):
@@ -67,25 +114,63 @@ def request_leaderboard(year: int, config: Config) -> Dict[int, DayScores]:
         return {}
 
     if leaderboard_path.exists():
-        leaderboard = _parse_leaderboard(leaderboard_path)
+        leaderboard = _load_leaderboard(leaderboard_path)
         less_than_30mins = time.time() - leaderboard_path.lstat().st_mtime < 60 * 30
         if less_than_30mins:
             print(f"Leaderboard for {year} is younger than 30 minutes, skipping download in order to avoid DDOS.")
             return leaderboard
-        has_no_none_values = all(itertools.chain(map(fields, leaderboard.values())))
-        if has_no_none_values and len(leaderboard) == 25:
+        # Same check as in RunState, which skips the run while a leaderboard would not be downloaded
+        is_complete = all(scores.time2 is not None for scores in leaderboard.values())
+        if is_complete and len(leaderboard) == days_in_year(year):
             print(f"Leaderboard for {year} is complete, no need to download.")
             return leaderboard
 
     with open(config.session_cookie_path) as cookie_file:
         session_cookie = cookie_file.read().strip()
         assert len(session_cookie) == 128, "Session cookie is not 128 characters long, make sure to remove the prefix!"
-        data = requests.get(
-            PERSONAL_LEADERBOARD_URL.format(year=year),
-            headers={"User-Agent": "https://github.com/LiquidFun/aoc_tiles by Brutenis Gliwa"},
-            cookies={"session": session_cookie},
-        ).text
+        with profiler.span("download leaderboard", "request", year=year):
+            data = (session or requests).get(
+                PERSONAL_LEADERBOARD_URL.format(year=year),
+                headers={"User-Agent": USER_AGENT},
+                cookies={"session": session_cookie},
+            ).text
         leaderboard_path.parent.mkdir(exist_ok=True, parents=True)
         with open(leaderboard_path, "w") as file:
             file.write(data)
-    return _parse_leaderboard(leaderboard_path)
+    return _load_leaderboard(leaderboard_path)
+
+
+class LeaderboardFetcher:
+    """Retrieves leaderboards of several years concurrently, reusing the connection to Advent of Code.
+
+    Use it as a context manager. Each year is only requested once, prefetching starts the request in the
+    background, while get waits for it to finish.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.year_to_future: Dict[int, Future] = {}
+        self.session: Optional[requests.Session] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    def __enter__(self) -> "LeaderboardFetcher":
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=MAX_PARALLEL_REQUESTS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(MAX_PARALLEL_REQUESTS, thread_name_prefix="leaderboard")
+        return self
+
+    def __exit__(self, *args):
+        self.executor.shutdown()
+        self.session.close()
+
+    def prefetch(self, years: Iterable[int]):
+        for year in years:
+            if year not in self.year_to_future:
+                logger.debug("Requesting leaderboard for year {}", year)
+                self.year_to_future[year] = self.executor.submit(request_leaderboard, year, self.config, self.session)
+
+    def get(self, year: int) -> Dict[int, DayScores]:
+        self.prefetch([year])
+        return self.year_to_future[year].result()
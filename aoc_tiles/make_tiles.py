@@ -1,18 +1,23 @@
 import re
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from contextlib import contextmanager
 from dataclasses import dataclass
 import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 
 from loguru import logger
 
+from aoc_tiles.atlas import add_image_map, atlas_columns, compose_atlas
+from aoc_tiles.cache import TileCache
 from aoc_tiles.colors import extension_to_colors, extension_to_programming_language
 from aoc_tiles.config import Config, TILE_WIDTH_SINCE_2025, TILE_WIDTH_PRE_2025
-from aoc_tiles.drawer import TileDrawer
 from aoc_tiles.html import HTML
-from aoc_tiles.leaderboard import DayScores, request_leaderboard
+from aoc_tiles.leaderboard import DayScores, LeaderboardFetcher
+from aoc_tiles.profiler import profiler
+from aoc_tiles.render import RenderPool, TileJob, estimate_render_cost
 from aoc_tiles.solutions import SolutionFinder
+from aoc_tiles.writer import write_text_if_changed
 
 README_TILES_BEGIN = "<!-- AOC TILES BEGIN -->"
 README_TILES_END = "<!-- AOC TILES END -->"
@@ -33,8 +38,15 @@ class SolveData:
 class TileMaker:
     def __init__(self, config: Config):
         self.config = config
-        self.tile_drawer = TileDrawer(config)
         self.solution_finder = SolutionFinder(config)
+        self.tile_cache = TileCache(config)
+        # Output files of this run, how many of them were written because their content changed, and how many
+        # outputs of the other output_images mode were removed
+        self.output_files = 0
+        self.written_files = 0
+        self.removed_files = 0
+        self.render_pool: Optional[RenderPool] = None
+        self.solve_data: Optional[SolveData] = None
 
     def _get_stars(self, solved: DayScores, solution: List[Path]):
         on_leaderboard = (
@@ -49,62 +61,86 @@ class TileMaker:
         }[self.config.count_as_solved_when]
 
     def compose_solve_data(self) -> SolveData:
-        solution_paths_by_year = self.solution_finder.get_solution_paths_by_year(
-            self.config.aoc_dir
-        )
-        years = solution_paths_by_year.keys()
-
         is_leaderboard_needed = self.config.what_to_show_on_right_side in [
             "time_and_rank"
         ] or self.config.count_as_solved_when in ["on_leaderboard", "both", "either"]
 
-        solve_data = SolveData({})
-
-        for year in years:
-            day_to_solution = solution_paths_by_year.get(year, {})
-            day_to_scores = {}
+        with LeaderboardFetcher(self.config) as leaderboard_fetcher:
+            if is_leaderboard_needed:
+                # Years which had solutions in the last run are very likely needed again, so they are retrieved
+                # while the solutions are being searched. Other cached leaderboards may be of years without
+                # solutions, which must not be downloaded again
+                leaderboard_fetcher.prefetch(self.solution_finder.discovery_index.get_years())
+
+            with profiler.span("discover solutions"):
+                solution_paths_by_year = self.solution_finder.get_solution_paths_by_year(
+                    self.config.aoc_dir
+                )
+            years = solution_paths_by_year.keys()
             if is_leaderboard_needed:
-                logger.debug("Requesting leaderboard for year {}", year)
-                day_to_scores = request_leaderboard(year, self.config)
+                leaderboard_fetcher.prefetch(years)
 
-            day_to_stars = {}
+            solve_data = SolveData({})
 
-            for day in range(1, 26):
-                stars = self._get_stars(
-                    day_to_scores.get(day), day_to_solution.get(day)
-                )
-                day_to_stars[day] = stars
+            for year in years:
+                day_to_solution = solution_paths_by_year.get(year, {})
+                day_to_scores = {}
+                if is_leaderboard_needed:
+                    with profiler.span("wait for leaderboard", year=year):
+                        day_to_scores = leaderboard_fetcher.get(year)
 
-            solve_data.year_to_data[year] = YearData(
-                day_to_scores, day_to_solution, day_to_stars
-            )
+                day_to_stars = {}
+
+                for day in range(1, 26):
+                    stars = self._get_stars(
+                        day_to_scores.get(day), day_to_solution.get(day)
+                    )
+                    day_to_stars[day] = stars
+
+                solve_data.year_to_data[year] = YearData(
+                    day_to_scores, day_to_solution, day_to_stars
+                )
         return solve_data
 
-    def handle_day(
+    def _get_languages(self, solutions: List[Path]) -> List[str]:
+        languages = []
+        for solution in solutions:
+            extension = solution.suffix
+            if extension in extension_to_colors() and extension not in languages:
+                languages.append(extension)
+        return languages
+
+    def _get_image_extension(self) -> str:
+        return ".gif" if self.config.animation != "none" else f".{self.config.image_format}"
+
+    def _get_tile_path(self, year: int, day: int) -> Path:
+        # With an atlas only the atlas is shown in the README, so the tiles are not stored in the image dir
+        if self.config.output_images == "atlas":
+            tile_dir = Path(self.config.cache_dir) / "tiles"
+        else:
+            tile_dir = self.config.image_dir
+        return tile_dir / f"{year:04}/{day:02}{self._get_image_extension()}"
+
+    def _get_atlas_path(self, year: int) -> Path:
+        return self.config.image_dir / f"{year:04}{self._get_image_extension()}"
+
+    def _get_tile_width(self, year: int) -> str:
+        tile_width = self.config.tile_width_px
+        if tile_width == "auto":
+            tile_width = TILE_WIDTH_SINCE_2025 if year >= 2025 else TILE_WIDTH_PRE_2025
+        return tile_width
+
+    def create_tile_job(
         self,
         day: int,
         year: int,
         solutions: List[Path],
         day_scores: Optional[DayScores],
-        needs_update: bool,
         stars: int,
-    ):
+    ) -> TileJob:
         logger.debug("day={} year={} solutions={}", day, year, solutions)
-        languages = []
-        for solution in solutions:
-            extension = solution.suffix
-            if extension in extension_to_colors() and extension not in languages:
-                languages.append(extension)
-        solution_link = solutions[0] if solutions else None
-        img_extension = ".gif" if self.config.animation != "none" else ".png"
-        day_graphic_path = self.config.image_dir / f"{year:04}/{day:02}{img_extension}"
-        day_graphic_path.parent.mkdir(parents=True, exist_ok=True)
-        if not day_graphic_path.exists() or needs_update:
-            self.tile_drawer.draw_tile(
-                f"{day:02}", languages, day_scores, day_graphic_path, stars=stars
-            )
-        day_graphic_path = day_graphic_path.relative_to(self.config.aoc_dir)
-        return day_graphic_path, solution_link
+        languages = self._get_languages(solutions)
+        return TileJob(year, day, languages, day_scores, stars, self._get_tile_path(year, day))
 
     def fill_empty_days_in_dict(
         self, day_to_solutions: Dict[int, List[Path]], max_day
@@ -127,9 +163,70 @@ class TileMaker:
             extension_to_programming_language()[extension] for extension in extensions
         ]
 
-    def handle_year(self, year: int, year_data: YearData, html: HTML):
+    def create_year_tile_jobs(self, year: int, year_data: YearData) -> Dict[int, TileJob]:
+        # Copy, as the languages used daily in the header should only consider days with solutions
+        day_to_solutions = dict(year_data.day_to_paths)
+        max_solved_day = max(
+            (day for day, stars in year_data.day_to_stars.items() if stars > 0),
+            default=0,
+        )
+        max_day = 25 if self.config.create_all_days else max_solved_day
+        self.fill_empty_days_in_dict(day_to_solutions, max_day)
+
+        return {
+            day: self.create_tile_job(
+                day,
+                year,
+                day_to_solutions.get(day, []),
+                year_data.day_to_scores.get(day),
+                year_data.day_to_stars[day],
+            )
+            for day in range(1, max_day + 1)
+        }
+
+    @contextmanager
+    def _open_render_pool(self) -> Iterator[RenderPool]:
+        """Uses the pool which is kept alive by the watch mode if there is one, otherwise a pool for this call."""
+        if self.render_pool is not None:
+            yield self.render_pool
+            return
+        with RenderPool(self.config) as render_pool:
+            yield render_pool
+
+    def render_tiles(self, jobs: List[TileJob]):
+        """Renders the outdated tiles of all years in a single pool, starting with the most expensive ones.
+
+        Scheduling all years at once avoids waiting for the slowest tile of each year before starting the next.
+        """
+        outdated_jobs = []
+        with profiler.span("check tile cache"):
+            for job in jobs:
+                fingerprint = self.tile_cache.fingerprint(job.day, job.languages, job.day_scores, job.stars)
+                if self.tile_cache.is_up_to_date(job.path, fingerprint):
+                    logger.debug("Tile for day {} of {} is up to date, skipping", job.day, job.year)
+                else:
+                    outdated_jobs.append((job, fingerprint))
+
+        logger.info("Rendering {} of {} tiles", len(outdated_jobs), len(jobs))
+        self.output_files += len(jobs)
+        if not outdated_jobs:
+            return
+
+        outdated_jobs.sort(key=lambda item: estimate_render_cost(item[0], self.config), reverse=True)
+        with profiler.span("render tiles", tiles=len(outdated_jobs)), self._open_render_pool() as render_pool:
+            future_to_fingerprint = {render_pool.submit(job): fingerprint for job, fingerprint in outdated_jobs}
+            total_bytes_saved = 0
+            for future in as_completed(future_to_fingerprint):
+                drawn_tile, worker_events = future.result()
+                profiler.add_events(worker_events)
+                self.tile_cache.update(drawn_tile.path, future_to_fingerprint[future])
+                total_bytes_saved += drawn_tile.bytes_saved
+                self.written_files += drawn_tile.written
+        if total_bytes_saved > 0:
+            print(f"Compact encoding saved {total_bytes_saved / 1024:.1f} KiB over {len(outdated_jobs)} tiles")
+
+    def handle_year(self, year: int, year_data: YearData, html: HTML, day_to_job: Dict[int, TileJob]):
         print(f"=== Generating table for year {year} ===")
-        leaderboard = year_data.day_to_scores
         day_to_solutions = year_data.day_to_paths
         with html.tag("h1", align="center"):
             stars = sum(year_data.day_to_stars.values())
@@ -137,62 +234,70 @@ class TileMaker:
                 self._get_programming_languages_used_daily(year_data)
             )
             html.push(f"{year} - {stars} ⭐{daily_language}")
-        max_solved_day = max(
-            (day for day, stars in year_data.day_to_stars.items() if stars > 0),
-            default=0,
-        )
-        max_day = 25 if self.config.create_all_days else max_solved_day
-        self.fill_empty_days_in_dict(day_to_solutions, max_day)
 
-        # completed_solutions = dict()
-        # completed_cache_path = self.config.cache_dir / f"completed-{year}.json"
-        # if completed_cache_path.exists():
-        #     with open(completed_cache_path, "r") as file:
-        #         completed_solutions = {int(day): solutions for day, solutions in json.load(file).items()}
-
-        day_to_future = {}
-        with ProcessPoolExecutor() as executor:
-            for day in range(1, max_day + 1):
-                solutions = day_to_solutions.get(day, [])
-                stars = year_data.day_to_stars[day]
-                future = executor.submit(
-                    self.handle_day,
-                    day,
-                    year,
-                    solutions,
-                    leaderboard.get(day),
-                    True,
-                    stars=stars,
-                )
-                day_to_future[day] = future
-
-        for day, future in day_to_future.items():
-            tile_path, solution_path = future.result()
+        solution_hrefs = {}
+        for day in day_to_job:
+            solutions = day_to_solutions.get(day, [])
+            solution_hrefs[day] = solutions[0].as_posix() if solutions else None
 
-            if solution_path is None:
-                solution_href = str(solution_path)
-            else:
-                solution_href = str(solution_path.as_posix())
-
-            tile_width = self.config.tile_width_px
-            if tile_width == "auto":
-                tile_width = (
-                    TILE_WIDTH_SINCE_2025 if year >= 2025 else TILE_WIDTH_PRE_2025
-                )
+        self._remove_outputs_of_other_mode(year)
+        if self.config.output_images == "atlas":
+            self.handle_year_atlas(year, html, day_to_job, solution_hrefs)
+            return
 
-            with html.tag("a", href=solution_href):
+        for day, job in day_to_job.items():
+            tile_path = job.path.relative_to(self.config.aoc_dir)
+            with html.tag("a", href=str(solution_hrefs[day])):
                 html.tag(
                     "img",
                     closing=False,
                     src=tile_path.as_posix(),
-                    width=tile_width,
+                    width=self._get_tile_width(year),
                 )
 
-        # with open(completed_cache_path, "w") as file:
-        #     completed_days = [day for day, scores in leaderboard.items() if scores.time2 is not None]
-        #     file.write(
-        #         json.dumps({day: solutions for day, solutions in day_to_solutions.items() if day in completed_days})
-        #     )
+    def _remove_outputs_of_other_mode(self, year: int):
+        """Removes the per-day tiles of the year when writing an atlas, and the atlas when writing per-day tiles."""
+        extensions = [".gif", ".png", ".webp"]
+        if self.config.output_images == "atlas":
+            tile_dir = self.config.image_dir / f"{year:04}"
+            stale_paths = [tile_dir / f"{day:02}{extension}" for day in range(1, 26) for extension in extensions]
+        else:
+            tile_dir = None
+            stale_paths = [self.config.image_dir / f"{year:04}{extension}" for extension in extensions]
+        for path in stale_paths:
+            if path.exists():
+                logger.info("Removing {}, which is not used with output_images={}", path, self.config.output_images)
+                path.unlink()
+                self.removed_files += 1
+        if tile_dir is not None and tile_dir.is_dir() and not any(tile_dir.iterdir()):
+            tile_dir.rmdir()
+
+    def handle_year_atlas(
+        self, year: int, html: HTML, day_to_job: Dict[int, TileJob], solution_hrefs: Dict[int, Optional[str]]
+    ):
+        """Combines the tiles of the year into a single image, with an image map linking each tile to its solution."""
+        if not day_to_job:
+            return
+        atlas_path = self._get_atlas_path(year)
+        tile_paths = [job.path for job in day_to_job.values()]
+        columns = atlas_columns(year)
+        fingerprint = self.tile_cache.atlas_fingerprint(tile_paths, columns)
+        self.output_files += 1
+        if self.tile_cache.is_up_to_date(atlas_path, fingerprint):
+            logger.debug("Atlas of {} is up to date, skipping", year)
+        else:
+            with profiler.span("compose atlas", year=year):
+                self.written_files += compose_atlas(tile_paths, columns, atlas_path, self.config.image_format)
+            self.tile_cache.update(atlas_path, fingerprint)
+
+        add_image_map(
+            html,
+            f"aoc-tiles-{year}",
+            atlas_path.relative_to(self.config.aoc_dir),
+            list(solution_hrefs.values()),
+            columns,
+            int(str(self._get_tile_width(year)).replace("px", "")),
+        )
 
     def _ensure_is_not_running_already(self):
         if self.config.aoc_tiles_dir.exists():
@@ -214,8 +319,8 @@ class TileMaker:
             pattern = re.compile(rf"{begin}.*{end}", re.DOTALL | re.MULTILINE)
             new_text = pattern.sub(f"{begin}\n{html}\n{end}", text)
 
-        with open(self.config.readme_path, "w", encoding="utf-8") as file:
-            file.write(str(new_text))
+        self.output_files += 1
+        self.written_files += write_text_if_changed(self.config.readme_path, new_text)
 
     @staticmethod
     def _get_total_possible_stars_for_date(utc_date: datetime.datetime):
@@ -246,34 +351,116 @@ class TileMaker:
             with html.tag("h1", align="center"):
                 html.push(f"Advent of Code - {total_stars}/{total_possible_stars} ⭐")
 
-    def make_tiles(self):
-        self._ensure_is_not_running_already()
-        print("Running AoC-Tiles")
-        solve_data = self.compose_solve_data()
-        logger.info("Found {} years with solutions", len(solve_data.year_to_data))
+    def write_outputs(self, solve_data: SolveData, years_to_render: Optional[Iterable[int]] = None):
+        """Renders the outdated tiles and writes the README.
+
+        If years_to_render is given, only tiles of these years are checked, the other tiles are presumed to be
+        up to date.
+        """
+        self.output_files = 0
+        self.written_files = 0
+        self.removed_files = 0
         html = HTML()
         self._add_total_completed_stars_to_html(solve_data, html)
 
-        for year, data in sorted(solve_data.year_to_data.items(), reverse=True):
-            logger.debug("year={} data={}", year, data)
-            self.handle_year(year, data, html)
-
-        self._write_to_readme(html)
-
+        years = sorted(solve_data.year_to_data.items(), reverse=True)
+        with profiler.span("create tile jobs"):
+            year_to_jobs = {year: self.create_year_tile_jobs(year, data) for year, data in years}
+        render_years = year_to_jobs.keys() if years_to_render is None else set(years_to_render)
+        self.render_tiles([job for year in render_years for job in year_to_jobs.get(year, {}).values()])
+
+        with profiler.span("generate html"):
+            for year, data in years:
+                logger.debug("year={} data={}", year, data)
+                self.handle_year(year, data, html, year_to_jobs[year])
+
+        with profiler.span("save caches"):
+            self.tile_cache.save()
+        with profiler.span("write readme"):
+            self._write_to_readme(html)
+        print(f"Wrote {self.written_files} of {self.output_files} output files, the others are unchanged")
+        if self.removed_files > 0:
+            print(f"Removed {self.removed_files} output files of the other output_images mode")
+
+    def add_outputs_to_git(self):
         if self.config.auto_add_tiles_to_git in ["add", "amend"]:
-            self.solution_finder.git_add(self.config.image_dir)
-            self.solution_finder.git_add(self.config.readme_path)
+            with profiler.span("git add"):
+                self.solution_finder.git_add(self.config.image_dir)
+                self.solution_finder.git_add(self.config.readme_path)
 
         if self.config.auto_add_tiles_to_git in ["amend"]:
             try:
                 with open(self.config.running_lock_path, "w") as file:
                     file.write("")
-                self.solution_finder.git_commit_amend()
+                with profiler.span("git amend"):
+                    self.solution_finder.git_commit_amend()
             finally:
                 # print("Could not amend commit. Maybe there is nothing to amend?")
                 if self.config.running_lock_path.exists():
                     self.config.running_lock_path.unlink()
 
+    def make_tiles(self):
+        self._ensure_is_not_running_already()
+        print("Running AoC-Tiles")
+        self._start_profiling()
+        self.solve_data = self.compose_solve_data()
+        logger.info("Found {} years with solutions", len(self.solve_data.year_to_data))
+        self.write_outputs(self.solve_data)
+        self.add_outputs_to_git()
+        self._finish_profiling()
+
+    def _start_profiling(self):
+        # The daemon and the watch mode run several times in the same process, each run gets its own trace
+        profiler.enabled = self.config.profile
+        profiler.take_events()
+
+    def _finish_profiling(self):
+        if self.config.profile:
+            trace_path = self.config.cache_dir / "profile.json"
+            profiler.write_trace(trace_path)
+            profiler.print_summary()
+            print(f"Wrote trace to {trace_path}, open it in https://ui.perfetto.dev or chrome://tracing")
+
+    def update_changed(self, changed_paths: List[str]):
+        """Updates the outputs after the given paths changed, used by the watch mode after make_tiles.
+
+        Changed paths are mapped to days with the year and day patterns, so that unrelated changes are ignored.
+        Otherwise, the solutions are discovered again, and the tiles of the years with changed solutions are
+        checked. Only the tiles whose inputs changed are drawn again.
+        """
+        matcher = self.solution_finder.matcher
+        # Solution files without a year and day are ignored anyway, directories and the git index may change
+        # any solution
+        if not any(
+            not matcher.is_solution_file(path) or self.solution_finder.get_year_and_day(path) is not None
+            for path in changed_paths
+        ):
+            logger.debug("Ignoring changes without year and day: {}", changed_paths)
+            return
+        self._start_profiling()
+        # Git only lists files again if its index changed
+        self.solution_finder.git_get_tracked_files.cache_clear()
+        solve_data = self.compose_solve_data()
+        changed_days = set()
+        for year in self.solve_data.year_to_data.keys() | solve_data.year_to_data.keys():
+            old_data = self.solve_data.year_to_data.get(year)
+            new_data = solve_data.year_to_data.get(year)
+            for day in range(1, 26):
+                old_paths = old_data.day_to_paths.get(day) if old_data is not None else None
+                new_paths = new_data.day_to_paths.get(day) if new_data is not None else None
+                if old_paths != new_paths:
+                    changed_days.add((year, day))
+        self.solve_data = solve_data
+
+        if not changed_days:
+            logger.debug("No solutions changed in {}", changed_paths)
+            return
+        print(f"Solutions changed for {', '.join(f'{year}/{day:02}' for year, day in sorted(changed_days))}")
+        self.write_outputs(solve_data, {year for year, _ in changed_days})
+        if self.written_files > 0 or self.removed_files > 0:
+            self.add_outputs_to_git()
+        self._finish_profiling()
+
 
 def main():
     TileMaker(Config()).make_tiles()
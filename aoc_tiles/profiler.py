@@ -0,0 +1,93 @@
+"""Records how long each stage of a run and each tile takes, enabled with --profile.
+
+The spans are written in the Chrome trace event format, which can be opened in https://ui.perfetto.dev or
+chrome://tracing. Render workers record their own spans, which are sent back with each rendered tile.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+
+class Profiler:
+    """Collects spans as Chrome trace events. Does nothing unless enabled."""
+
+    def __init__(self):
+        self.enabled = False
+        self.events: List[Dict] = []
+
+    @contextmanager
+    def span(self, name: str, category: str = "stage", **args):
+        if not self.enabled:
+            yield
+            return
+        # Wall clock time, as it is comparable between the main process and the workers
+        start = time.time_ns()
+        try:
+            yield
+        finally:
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": start / 1000,
+                    "dur": (time.time_ns() - start) / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": args,
+                }
+            )
+
+    def take_events(self) -> List[Dict]:
+        """Returns and forgets the events recorded so far, used by workers to send them to the main process."""
+        events, self.events = self.events, []
+        return events
+
+    def add_events(self, events: Iterable[Dict]):
+        self.events.extend(events)
+
+    def write_trace(self, path: Path):
+        main_pid = os.getpid()
+        metadata = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": "aoc-tiles" if pid == main_pid else "render worker"},
+            }
+            for pid in sorted({event["pid"] for event in self.events})
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, file)
+
+    def print_summary(self, top: int = 10):
+        stage_durations: Dict[str, float] = defaultdict(float)
+        for event in self.events:
+            if event["cat"] == "stage":
+                stage_durations[event["name"]] += event["dur"]
+        print("=== Slowest stages ===")
+        for name, duration in sorted(stage_durations.items(), key=lambda item: -item[1])[:top]:
+            print(f"{duration / 1000:9.1f} ms  {name}")
+
+        tiles = sorted((event for event in self.events if event["cat"] == "tile"), key=lambda event: -event["dur"])
+        if tiles:
+            print(f"=== Slowest tiles (of {len(tiles)}) ===")
+            tile_stages = defaultdict(dict)
+            for event in self.events:
+                if event["cat"] == "tile_stage":
+                    tile_stages[event["args"]["tile"]][event["name"]] = event["dur"]
+            for event in tiles[:top]:
+                name = event["args"]["tile"]
+                stages = ", ".join(f"{stage} {duration / 1000:.1f} ms" for stage, duration in tile_stages[name].items())
+                print(f"{event['dur'] / 1000:9.1f} ms  {name} ({stages})")
+
+
+# Profiler of the current process
+profiler = Profiler()
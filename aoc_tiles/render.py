@@ -0,0 +1,149 @@
+"""Rendering of tiles in a pool of worker processes.
+
+Workers are initialized once with the config, so that the theme, fonts and language table are loaded once per
+process. Each task only receives a small TileJob instead of the whole TileMaker.
+"""
+
+import os
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from loguru import logger
+from PIL import Image
+
+from aoc_tiles.colors import extension_to_colors
+from aoc_tiles.config import Config
+from aoc_tiles.drawer import DrawnTile, TileDrawer
+from aoc_tiles.fonts import main_font, secondary_font
+from aoc_tiles.leaderboard import DayScores
+from aoc_tiles.profiler import profiler
+
+
+class TileJob:
+    """Everything needed to draw a single tile."""
+
+    __slots__ = ("year", "day", "languages", "day_scores", "stars", "path")
+
+    def __init__(
+        self,
+        year: int,
+        day: int,
+        languages: List[str],
+        day_scores: Union[DayScores, None],
+        stars: int,
+        path: Path,
+    ):
+        self.year = year
+        self.day = day
+        self.languages = languages
+        self.day_scores = day_scores
+        self.stars = stars
+        self.path = path
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"TileJob(year={self.year}, day={self.day}, languages={self.languages}, stars={self.stars})"
+
+
+# Rough render and encode time of a tile in milliseconds, used to schedule the most expensive tiles first. Measured
+# with tests/benchmark.py, remeasure them when drawing or encoding a theme or animation gets a lot faster or slower
+THEME_BASE_COST = {"modern": 2.0, "aoc": 5.0}
+# Additional cost per star, as solved parts draw more (glowing) text
+THEME_STAR_COST = {"modern": 0.7, "aoc": 1.5}
+# Additional cost per language, as each one adds a stripe or decoration color
+LANGUAGE_COST = 0.3
+# Animated tiles are dominated by drawing and encoding the frames
+ANIMATION_COST = {"none": 0.0, "snow": 42.0}
+
+
+def estimate_render_cost(job: TileJob, config: Config) -> float:
+    return (
+        THEME_BASE_COST.get(config.theme, max(THEME_BASE_COST.values()))
+        + THEME_STAR_COST.get(config.theme, max(THEME_STAR_COST.values())) * job.stars
+        + ANIMATION_COST.get(config.animation, max(ANIMATION_COST.values()))
+        + LANGUAGE_COST * len(job.languages)
+    )
+
+
+# The drawer of the current worker process, set by _init_worker
+_tile_drawer: Optional[TileDrawer] = None
+
+
+def _init_worker(config: Config):
+    global _tile_drawer
+    # Forked workers inherit the output of the parent, which the daemon redirects to the connection of a request
+    sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    if config.aoc_dir is not None:
+        config.configure_logger()
+    profiler.enabled = config.profile
+    with profiler.span("init worker", "worker"):
+        _tile_drawer = TileDrawer(config)
+        # Load the language table and fonts upfront, instead of in the first task of each worker
+        extension_to_colors()
+        main_font(20)
+        secondary_font(14)
+
+
+def _is_ready() -> bool:
+    return True
+
+
+def render_tile(job: TileJob) -> Tuple[DrawnTile, List[Dict]]:
+    """Draws the tile of the job in the current process. Also returns the profiler events of the worker."""
+    logger.debug("Drawing {}", job)
+    with profiler.span("tile", "tile", tile=str(job.path)):
+        drawn_tile = _tile_drawer.draw_tile(
+            f"{job.day:02}", job.languages, job.day_scores, job.path, stars=job.stars
+        )
+    return drawn_tile, profiler.take_events()
+
+
+def render_tile_in_memory(
+    job: TileJob, encode: bool, tile_drawer: Optional[TileDrawer] = None
+) -> Union[bytes, Image.Image]:
+    """Draws the tile of the job without writing it, with the drawer of the worker process unless one is given.
+
+    Returns the encoded tile, or if encode is False the static tile as an image. Used by aoc_tiles.api.
+    """
+    tile_drawer = tile_drawer if tile_drawer is not None else _tile_drawer
+    image = tile_drawer.render_tile(f"{job.day:02}", job.languages, job.day_scores, job.stars)
+    if not encode:
+        return image
+    return tile_drawer.encode_tile_to_bytes(image, seed=str(job.path))
+
+
+class RenderPool:
+    """Process pool which is kept alive for all tiles of a run. Use it as a context manager."""
+
+    def __init__(self, config: Config, max_workers: Optional[int] = None):
+        self.config = config
+        self.max_workers = max_workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "RenderPool":
+        self.executor = ProcessPoolExecutor(self.max_workers, initializer=_init_worker, initargs=(self.config,))
+        return self
+
+    def __exit__(self, *args):
+        self.executor.shutdown()
+        self.executor = None
+
+    def start_workers(self):
+        """Starts and initializes the workers now, instead of when the first tiles are submitted."""
+        futures = [self.executor.submit(_is_ready) for _ in range(self.max_workers or os.cpu_count() or 1)]
+        for future in futures:
+            future.result()
+
+    def submit(self, job: TileJob) -> "Future[Tuple[DrawnTile, List[Dict]]]":
+        return self.executor.submit(render_tile, job)
+
+    def submit_in_memory(self, job: TileJob, encode: bool) -> "Future[Union[bytes, Image.Image]]":
+        return self.executor.submit(render_tile_in_memory, job, encode)
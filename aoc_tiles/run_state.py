@@ -0,0 +1,173 @@
+"""Cheap check whether a run would change anything, so that the hook can exit before loading heavy modules.
+
+Only the standard library may be imported here, as this runs before anything else on every invocation.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Leaderboards younger than this are never downloaded again, see leaderboard.request_leaderboard
+LEADERBOARD_MAX_AGE_SECONDS = 60 * 30
+LANGUAGES_TABLE_PATH = Path(__file__).parent / "resources" / "languages.json"
+
+
+def days_in_year(year: int) -> int:
+    """Number of days of an Advent of Code, since 2025 there are only 12."""
+    return 12 if year >= 2025 else 25
+
+
+def _stat(path: Path) -> Optional[List[int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def package_state() -> Dict[str, Optional[List[int]]]:
+    """Stats of the package files, which change whenever the package is updated."""
+    package_dir = Path(__file__).parent
+    return {path.name: _stat(path) for path in sorted(package_dir.glob("*.py"))}
+
+
+def _git_index_path(aoc_dir: Path) -> Optional[Path]:
+    git_path = aoc_dir / ".git"
+    if git_path.is_dir():
+        return git_path / "index"
+    if git_path.is_file():
+        # Worktrees and submodules contain a file pointing to the actual git directory
+        content = git_path.read_text().strip()
+        if content.startswith("gitdir:"):
+            return (aoc_dir / content[len("gitdir:") :].strip()) / "index"
+    return None
+
+
+def _tracked_solution_files_digest(aoc_dir: Path) -> Optional[str]:
+    """Hash of the tracked files with supported extensions which exist in the working tree.
+
+    Unlike the git index, this only changes when solutions are added or removed, not on every commit. All tracked
+    files are listed and filtered here, as git would match every file against the hundreds of extensions if they
+    were given as pathspecs, which takes seconds in large repositories.
+    """
+    with open(LANGUAGES_TABLE_PATH) as file:
+        # Same extensions as colors.extension_to_colors, which the solutions are filtered by
+        extensions = {extension.encode() for extension, entry in json.load(file).items() if entry[1] is not None}
+    try:
+        result = subprocess.run(
+            ["git", "ls-files", "-z"], cwd=aoc_dir, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    files = [file for file in result.stdout.split(b"\0") if file[file.rfind(b".") :] in extensions]
+    # Only the solutions are checked for deletion, git would check every tracked file
+    root = os.fsencode(aoc_dir)
+    existing_files = [file for file in files if os.path.lexists(os.path.join(root, file))]
+    return hashlib.sha256(b"\0".join(existing_files)).hexdigest()
+
+
+def _aoc_dir_from_args(args: List[str]) -> Path:
+    for i, arg in enumerate(args):
+        if arg.startswith("--aoc-dir="):
+            return Path(arg[len("--aoc-dir=") :])
+        if arg == "--aoc-dir" and i + 1 < len(args):
+            return Path(args[i + 1])
+    return Path("./")
+
+
+class RunState:
+    """Fingerprint of everything a run depends on: arguments, tracked files, leaderboards, outputs and the date.
+
+    The fingerprint is stored after each successful run. If it is unchanged on the next invocation, and no
+    leaderboard would be downloaded again, the run can be skipped.
+    """
+
+    def __init__(self, args: List[str]):
+        self.args = args
+        self.aoc_dir = _aoc_dir_from_args(args)
+        self.aoc_tiles_dir = self.aoc_dir / ".aoc_tiles"
+        self.cache_dir = self.aoc_tiles_dir / "cache"
+        self.path = self.cache_dir / "run_state.json"
+
+    def is_running(self) -> bool:
+        """Whether another run is amending the commit, see TileMaker.add_outputs_to_git."""
+        return (self.aoc_tiles_dir / "running.lock").exists()
+
+    def _leaderboard_paths(self) -> List[Path]:
+        if not self.cache_dir.is_dir():
+            return []
+        return sorted(path for path in self.cache_dir.glob("leaderboard*.html"))
+
+    def _session_cookie_paths(self) -> List[Path]:
+        return [self.aoc_tiles_dir / "session.cookie", self.aoc_dir / "session.cookie"]
+
+    def fingerprint(self) -> Optional[str]:
+        """Returns None if no cheap fingerprint is possible, e.g. when the solutions are not tracked by git."""
+        git_index_path = _git_index_path(self.aoc_dir)
+        if git_index_path is None or not git_index_path.exists():
+            return None
+        solution_files = _tracked_solution_files_digest(self.aoc_dir)
+        if solution_files is None:
+            return None
+        tiles_dir = self.aoc_tiles_dir / "tiles"
+        now = datetime.datetime.now(datetime.timezone.utc)
+        inputs = {
+            "args": self.args,
+            "aoc_dir": str(self.aoc_dir.resolve()),
+            "package": package_state(),
+            "solution_files": solution_files,
+            "session_cookie": [_stat(path) for path in self._session_cookie_paths()],
+            "leaderboards": {path.name: _stat(path) for path in self._leaderboard_paths()},
+            "readme": {path.name: _stat(path) for path in self.aoc_dir.glob("[Rr][Ee][Aa][Dd][Mm][Ee].[Mm][Dd]")},
+            "tiles": _stat(self.cache_dir / "tiles.json"),
+            "tile_dirs": {path.name: _stat(path) for path in tiles_dir.iterdir()} if tiles_dir.is_dir() else None,
+            # Total possible stars and unlocked years and days depend on the date
+            "date": now.strftime("%Y-%m-%d"),
+            "after_unlock": now.hour >= 5,
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def _valid_until(self) -> float:
+        """Time at which the next run would download a leaderboard again."""
+        if not any(path.exists() for path in self._session_cookie_paths()):
+            return float("inf")
+        valid_until = float("inf")
+        for path in self._leaderboard_paths():
+            try:
+                year = int(path.stem[len("leaderboard") :])
+                with open(path.with_suffix(".json")) as file:
+                    days = json.load(file)["days"]
+                # Complete once both parts of every day are solved, the time of part 2 is at index 3
+                is_complete = len(days) == days_in_year(year) and all(s[3] is not None for s in days.values())
+            except (OSError, ValueError, KeyError, TypeError, IndexError):
+                is_complete = False
+            if not is_complete:
+                valid_until = min(valid_until, path.stat().st_mtime + LEADERBOARD_MAX_AGE_SECONDS)
+        return valid_until
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def is_up_to_date(self) -> bool:
+        state = self._load()
+        if "fingerprint" not in state or time.time() >= state.get("valid_until", 0):
+            return False
+        return state["fingerprint"] == self.fingerprint()
+
+    def save(self):
+        fingerprint = self.fingerprint()
+        if fingerprint is None:
+            return
+        valid_until = self._valid_until()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.path, "w") as file:
+            json.dump({"fingerprint": fingerprint, "valid_until": min(valid_until, 1e300)}, file)
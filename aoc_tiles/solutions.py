@@ -1,20 +1,103 @@
+import os
 import re
 from collections import defaultdict
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import git
 from git import GitCommandError, InvalidGitRepositoryError
 from loguru import logger
 
+from aoc_tiles.cache import DiscoveryIndex
 from aoc_tiles.colors import extension_to_colors
 from aoc_tiles.config import Config
 
 
+def _glob_to_regex(pattern: str) -> str:
+    """Translates a glob pattern to a regex, where wildcards do not match across path separators."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        i += 1
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = pattern.find("]", i + 1 if pattern[i : i + 1] in ("!", "]") else i)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                chars = pattern[i:end].replace("\\", "\\\\")
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                elif chars.startswith("^"):
+                    chars = "\\" + chars
+                regex += f"[{chars}]"
+                i = end + 1
+        else:
+            regex += re.escape(char)
+    return regex
+
+
+class SolutionMatcher:
+    """Decides which paths are solutions, compiled once from the exclude patterns and supported extensions.
+
+    Exclude patterns are matched from the right like Path.match, i.e. '*.py' matches Python files in all
+    directories. A pattern which matches a directory excludes everything inside of it, so that the directory
+    does not need to be walked at all. Paths are always posix paths relative to the root of the search.
+    """
+
+    # Directories which never contain solutions and are skipped when walking
+    DEFAULT_EXCLUDED_DIRECTORIES = {
+        ".git",
+        ".hg",
+        ".svn",
+        ".aoc_tiles",
+        ".venv",
+        ".tox",
+        ".mypy_cache",
+        ".pytest_cache",
+        "__pycache__",
+        "node_modules",
+    }
+
+    def __init__(self, exclude_patterns: Iterable[str], extensions: Iterable[str]):
+        self.exclude_patterns = [pattern for pattern in exclude_patterns if pattern]
+        self.extensions = frozenset(extensions)
+        alternatives = []
+        for pattern in self.exclude_patterns:
+            pattern = pattern.replace("\\", "/") if os.name == "nt" else pattern
+            if pattern.startswith("/"):
+                alternatives.append("^" + "/".join(map(_glob_to_regex, pattern[1:].split("/"))))
+            else:
+                alternatives.append("(?:^|/)" + "/".join(map(_glob_to_regex, pattern.split("/"))))
+        flags = re.IGNORECASE if os.name == "nt" else 0
+        # Matches if the path itself or one of its parent directories matches
+        self.exclude_regex = re.compile(f"(?:{'|'.join(alternatives)})(?:/|$)", flags) if alternatives else None
+
+    def is_excluded(self, path: str) -> bool:
+        if self.exclude_regex is not None and self.exclude_regex.search(path):
+            logger.debug("Excluded: {} because of patterns: {}", path, self.exclude_patterns)
+            return True
+        return False
+
+    def is_solution_file(self, path: str) -> bool:
+        return os.path.splitext(path)[1] in self.extensions and not self.is_excluded(path)
+
+    def should_walk_directory(self, name: str, path: str) -> bool:
+        return name not in self.DEFAULT_EXCLUDED_DIRECTORIES and not self.is_excluded(path)
+
+
 class SolutionFinder:
     def __init__(self, config: Config):
         self.config = config
+        self.discovery_index = DiscoveryIndex(config)
+        self.matcher = SolutionMatcher(config.exclude_patterns, extension_to_colors().keys())
+        self.year_pattern = re.compile(config.year_pattern)
+        self.day_pattern = re.compile(config.day_pattern)
         try:
             self.repository = git.Repo(config.aoc_dir)
         except InvalidGitRepositoryError:
@@ -32,26 +115,34 @@ class SolutionFinder:
 
     def get_solution_paths_by_year(self, aoc_dir: Path) -> Dict[int, Dict[int, List[Path]]]:
         day_to_solution_paths = defaultdict(lambda: defaultdict(list))
-        year_pattern = re.compile(self.config.year_pattern)
-        day_pattern = re.compile(self.config.day_pattern)
         logger.debug("Finding solution files recursively in {}", aoc_dir)
         candidate_paths = sorted(self._find_recursive_solution_files(aoc_dir))
         logger.debug("Candidate paths: {}", candidate_paths)
         for path in candidate_paths:
-            years = year_pattern.findall(path.as_posix())
-            days = day_pattern.findall(path.as_posix())
-            year = None
-            if years:
-                year = int(years[-1])
-            if self.config.overwrite_year is not None:
-                year = self.config.overwrite_year
-            if year is not None and days:
-                day_to_solution_paths[year][int(days[0])].append(path)
+            year_and_day = self.get_year_and_day(path.as_posix())
+            if year_and_day is not None:
+                year, day = year_and_day
+                day_to_solution_paths[year][day].append(path)
 
         self._ensure_sorting(day_to_solution_paths)
+        self.discovery_index.set_years(sorted(day_to_solution_paths))
+        self.discovery_index.save()
         # pprint(day_to_solution_paths)
         return day_to_solution_paths
 
+    def get_year_and_day(self, path: str) -> Optional[Tuple[int, int]]:
+        """Year and day of a posix path according to the year and day patterns, None if either is missing."""
+        years = self.year_pattern.findall(path)
+        days = self.day_pattern.findall(path)
+        year = None
+        if years:
+            year = int(years[-1])
+        if self.config.overwrite_year is not None:
+            year = self.config.overwrite_year
+        if year is not None and days:
+            return year, int(days[0])
+        return None
+
     def _ensure_sorting(self, solution_paths_dict: Dict[int, Dict[int, List[str]]]) -> Dict[int, Dict[int, List[str]]]:
         def sort_key(path: Path):
             suffix = path.suffix.lower()
@@ -66,28 +157,80 @@ class SolutionFinder:
 
     def _find_recursive_solution_files(self, directory: Path) -> List[Path]:
         if self.config.only_use_solutions_in_git and self.repository is not None:
-            files = [Path(s) for s in self.git_get_tracked_files()]
+            # The index is trusted for existence, apart from tracked files which were deleted since. Only the
+            # solutions are checked, so that nothing is listed by git if its index is unchanged
+            solution_paths = [
+                Path(s) for s in self._find_tracked_solution_files() if os.path.lexists(os.path.join(directory, s))
+            ]
         else:
-            files = list(directory.rglob("*"))
+            solution_paths = self._walk_solution_files(directory)
 
-        logger.debug("Found {} files", len(files))
-        logger.trace(f"Files: {files}")
-        solution_paths = []
-        for path in files:
-            extension_is_supported = path.suffix in extension_to_colors()
-            path_is_excluded = any([path.match(exclude) for exclude in self.config.exclude_patterns])
-            if path_is_excluded:
-                logger.debug(
-                    "Excluded: {} because of patterns: {}",
-                    path,
-                    self.config.exclude_patterns,
-                )
-            if path.is_file() and extension_is_supported and not path_is_excluded:
-                solution_paths.append(path)
         logger.debug("Found {} solution files", len(solution_paths))
         logger.trace("Solution files:", "\n".join(map(str, solution_paths)))
         return solution_paths
 
+    def _git_index_state(self) -> Optional[List[int]]:
+        try:
+            stat = (Path(self.repository.git_dir) / "index").stat()
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _find_tracked_solution_files(self) -> List[str]:
+        """Tracked solution files, only listed again if the git index changed since the last run.
+
+        All tracked files are listed, as git would match every file against the hundreds of supported extensions
+        if they were given as pathspecs, which takes seconds in large repositories.
+        """
+        index_state = self._git_index_state()
+        if index_state is not None:
+            files = self.discovery_index.get_git_files(index_state)
+            if files is not None:
+                logger.debug("Git index is unchanged, reusing {} solution files", len(files))
+                return files
+
+        tracked_files = self.git_get_tracked_files()
+        files = [file for file in tracked_files if self.matcher.is_solution_file(file)]
+        logger.debug("Found {} files with supported extensions out of {} tracked files", len(files), len(tracked_files))
+        logger.trace(f"Files: {files}")
+        if index_state is not None:
+            self.discovery_index.set_git_files(index_state, files)
+        return files
+
+    def _walk_solution_files(self, directory: Path) -> List[Path]:
+        """Walks the directory, skipping excluded directories entirely.
+
+        Directories which did not change since the last run are not listed again.
+        """
+        solution_paths = []
+        # Pairs of the path to the directory and the path relative to the searched directory
+        directories = [(str(directory), "")]
+        while directories:
+            current, relative = directories.pop()
+            try:
+                mtime_ns = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+            cached = self.discovery_index.get_directory(relative or ".", mtime_ns)
+            if cached is None:
+                files, subdirectories = [], []
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        entry_relative = f"{relative}/{entry.name}" if relative else entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.matcher.should_walk_directory(entry.name, entry_relative):
+                                subdirectories.append(entry.name)
+                        elif self.matcher.is_solution_file(entry_relative) and entry.is_file():
+                            files.append(entry.name)
+                self.discovery_index.set_directory(relative or ".", mtime_ns, files, subdirectories)
+            else:
+                files, subdirectories = cached
+            for name in files:
+                solution_paths.append(directory / (f"{relative}/{name}" if relative else name))
+            for name in subdirectories:
+                directories.append((os.path.join(current, name), f"{relative}/{name}" if relative else name))
+        return solution_paths
+
     def git_is_file_ignored(self, filepath):
         if self.repository is None:
             return False
@@ -97,15 +240,19 @@ class SolutionFinder:
         except GitCommandError:
             return False
 
-    @lru_cache
-    def git_get_tracked_files(self) -> List[str]:
+    def _git_ls_files(self, *args: str) -> List[str]:
         if self.repository is None:
             return []
-        return self.repository.git.ls_files().split("\n")
+        # NUL separated output, as file names with special characters are quoted otherwise
+        return [file for file in self.repository.git.ls_files("-z", *args).split("\0") if file]
+
+    @lru_cache
+    def git_get_tracked_files(self, *pathspecs: str) -> List[str]:
+        """Tracked files matching any of the pathspecs, or all tracked files if none are given."""
+        return self._git_ls_files("--", *pathspecs)
 
     def git_is_file_tracked(self, filepath: Path):
-        tracked_files = self.git_get_tracked_files()
-        return str(filepath) in tracked_files
+        return len(self.git_get_tracked_files(f":(literal){filepath}")) > 0
 
     def git_add(self, path: Path):
         if self.repository is not None and path.exists():
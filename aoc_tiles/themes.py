@@ -3,26 +3,27 @@
 Provides different visual styles for the generated tiles.
 """
 
+import hashlib
+import os
 from abc import ABC, abstractmethod
-from functools import partial
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
-from PIL import Image, ImageColor, ImageDraw
+from PIL import Image, ImageChops, ImageDraw, ImageFont
 
-from aoc_tiles.colors import color_similarity, darker_color, extension_to_colors
+from aoc_tiles.cache import package_version
+from aoc_tiles.colors import color_similarity, darker_color, extension_to_luminance, extension_to_rgb
 from aoc_tiles.fonts import main_font, secondary_font
+from aoc_tiles.glyphs import draw_text, text_bbox, text_mask
 from aoc_tiles.leaderboard import DayScores
 
 
-def format_time(time: str) -> str:
+def format_time(seconds: int) -> str:
     """Formats time as mm:ss if the time is below 1 hour, otherwise it returns >1h to a max of >24h"""
-    time = time.replace("&gt;", ">")
-    if ">" in time:
-        formatted = time
-    else:
-        h, m, s = time.split(":")
-        formatted = f">{h}h" if int(h) >= 1 else f"{m}:{s}"
+    h, rest = divmod(seconds, 3600)
+    m, s = divmod(rest, 60)
+    formatted = f">{h:02}h" if h >= 1 else f"{m:02}:{s:02}"
     return f"{formatted:>5}"
 
 
@@ -35,6 +36,20 @@ class Theme(ABC):
         self.config = config
 
     @abstractmethod
+    def render_tile(
+        self,
+        day: str,
+        languages: List[str],
+        day_scores: Union[DayScores, None],
+        stars: int,
+    ) -> Image.Image:
+        """Draw a tile and return it as an RGB image."""
+        pass
+
+    def common_texts(self) -> List[Tuple[ImageFont.FreeTypeFont, str, int]]:
+        """Texts (font, text, stroke width) which are on many tiles, their masks are persisted, see glyphs."""
+        return []
+
     def draw_tile(
         self,
         day: str,
@@ -44,7 +59,60 @@ class Theme(ABC):
         stars: int,
     ) -> None:
         """Draw a tile and save it to the given path."""
-        pass
+        self.render_tile(day, languages, day_scores, stars).save(path)
+
+
+class Overlay:
+    """Elements which are the same on many tiles, pasted onto a tile with as few operations as possible.
+
+    Elements are added in drawing order. Each one goes into the first layer after all layers it overlaps, as pasting
+    elements which do not overlap at once gives exactly the same pixels as drawing them one after another.
+    """
+
+    def __init__(self, size: Tuple[int, int]):
+        self.size = size
+        # Colors and mask of each layer
+        self.layers: List[Tuple[Image.Image, Image.Image]] = []
+        self._cropped_layers: Optional[List[Tuple[Image.Image, Tuple[int, int, int, int], Image.Image]]] = None
+
+    def add_mask(self, mask: Image.Image, color):
+        index = 0
+        for i, (_, layer_mask) in enumerate(self.layers):
+            if ImageChops.darker(mask, layer_mask).getbbox():
+                index = i + 1
+        if index == len(self.layers):
+            self.layers.append((Image.new("RGB", self.size), Image.new("L", self.size, 0)))
+        colors, layer_mask = self.layers[index]
+        self._cropped_layers = None
+        colors.paste(color, mask=mask.point(lambda value: 255 if value else 0))
+        self.layers[index] = (colors, ImageChops.lighter(layer_mask, mask))
+
+    def add_text(self, xy: Tuple[int, int], text: str, fill, font, stroke_width: int = 0, stroke_fill=None):
+        """Same as glyphs.draw_text."""
+        if stroke_width:
+            stroke_color = fill if stroke_fill is None else stroke_fill
+            self.add_mask(self._place(xy, *text_mask(font, text, stroke_width)), stroke_color)
+        self.add_mask(self._place(xy, *text_mask(font, text)), fill)
+
+    def add_line(self, xy: Tuple[int, ...], fill, width: int):
+        mask = Image.new("L", self.size, 0)
+        ImageDraw.ImageDraw(mask).line(xy, fill=255, width=width)
+        self.add_mask(mask, fill)
+
+    def _place(self, xy: Tuple[int, int], mask: Image.Image, offset: Tuple[int, int]) -> Image.Image:
+        placed = Image.new("L", self.size, 0)
+        placed.paste(mask, (xy[0] + offset[0], xy[1] + offset[1]))
+        return placed
+
+    def paste(self, image: Image.Image):
+        if self._cropped_layers is None:
+            # Only the part with elements is pasted, which is a lot faster than pasting the whole tile
+            boxes = [mask.getbbox() for _, mask in self.layers]
+            self._cropped_layers = [
+                (colors.crop(box), box, mask.crop(box)) for (colors, mask), box in zip(self.layers, boxes) if box
+            ]
+        for colors, box, mask in self._cropped_layers:
+            image.paste(colors, box, mask)
 
 
 class ModernTheme(Theme):
@@ -55,15 +123,33 @@ class ModernTheme(Theme):
 
     name = "modern"
 
-    def draw_tile(
+    def common_texts(self) -> List[Tuple[ImageFont.FreeTypeFont, str, int]]:
+        texts = [
+            (main_font(20), "Day"),
+            *((main_font(75), f"{day:02}") for day in range(1, 26)),
+            (main_font(25), "P1 "),
+            (main_font(25), "P2 "),
+            (secondary_font(10), "time"),
+            (secondary_font(10), "rank"),
+        ]
+        stroke_widths = [0, 1] if "outline" in self.config.contrast_improvement_type else [0]
+        return [(font, text, stroke_width) for font, text in texts for stroke_width in stroke_widths]
+
+    # Overlays of this process, see _get_overlays
+    _overlays: Dict[Tuple, Tuple[Overlay, Overlay]] = {}
+
+    def render_tile(
         self,
         day: str,
         languages: List[str],
         day_scores: Union[DayScores, None],
-        path: Path,
         stars: int,
-    ) -> None:
-        """Saves a graphic for a given day and year. Returns the path to it."""
+    ) -> Image.Image:
+        """Draws the graphic for a given day.
+
+        Everything except the day number, languages, times and ranks is pasted from overlays, which are shared
+        between all tiles with the same colors and solved parts.
+        """
         image = self._get_alternating_background(languages, stars == 2)
         drawer = ImageDraw.ImageDraw(image)
         text_kwargs = {"fill": self.config.text_color}
@@ -71,11 +157,11 @@ class ModernTheme(Theme):
         # Get all colors of the day, check if any one is similar to TEXT_COLOR
         # If yes, add outline
         for language in languages:
-            color = ImageColor.getrgb(extension_to_colors()[language])
             if color_similarity(
-                color,
+                extension_to_rgb()[language],
                 self.config.text_color,
                 self.config.contrast_improvement_threshold,
+                luminance_a=extension_to_luminance()[language],
             ):
                 if "outline" in self.config.contrast_improvement_type:
                     text_kwargs["stroke_width"] = 1
@@ -84,96 +170,189 @@ class ModernTheme(Theme):
                     text_kwargs["fill"] = self.config.not_completed_color
                 break
 
-        draw_text = lambda *args, **kwargs: drawer.text(*args, **kwargs, **text_kwargs)
-        draw_line = partial(drawer.line, fill=text_kwargs["fill"], width=2)
+        show_checkmark = self.config.what_to_show_on_right_side == "checkmark" or day_scores is None
+        parts = []
+        for part in (1, 2):
+            rank = getattr(day_scores, f"rank{part}", None)
+            color_override = self.config.top100_color if rank and rank <= 100 else self.config.text_color
+            parts.append((stars >= part, color_override, show_checkmark, bool(rank)))
+        label_overlay, right_overlay = self._get_overlays(tuple(text_kwargs.items()), tuple(parts))
+
+        draw_tile_text = lambda *args, **kwargs: draw_text(drawer, *args, **kwargs, **text_kwargs)
+        line_color = text_kwargs["fill"]
 
         # === Left side ===
-        draw_text((3, -5), "Day", align="left", font=main_font(20))
-        draw_text((1, -10), str(day), align="center", font=main_font(75))
+        label_overlay.paste(image)
+        draw_tile_text((1, -10), str(day), font=main_font(75))
 
         # Calculate font size based on number of characters, because it might overflow
         lang_as_str = " ".join(languages)
         lang_font_size = max(6, int(18 - max(0, len(lang_as_str) - 8) * 1.3))
-        draw_text((0, 74), lang_as_str, align="left", font=secondary_font(lang_font_size))
+        draw_tile_text((0, 74), lang_as_str, font=secondary_font(lang_font_size))
 
         # === Right side (P1 & P2) ===
-        for part in (1, 2):
+        # The overlay does not overlap the times and ranks, so drawing them afterwards gives the same pixels
+        right_overlay.paste(image)
+        for part, (solved, color_override, _, _) in zip((1, 2), parts):
+            if not solved or show_checkmark or self.config.what_to_show_on_right_side != "time_and_rank":
+                continue
             y = 50 if part == 2 else 0
             time = getattr(day_scores, f"time{part}", None)
             rank = getattr(day_scores, f"rank{part}", None)
-
-            color_override = self.config.top100_color if rank and int(rank) <= 100 else self.config.text_color
             text_kwargs["fill"] = color_override
+            draw_tile_text((143, 3 + y), format_time(time), font=secondary_font(18))
+            if rank:
+                draw_tile_text((133, 23 + y), f"{rank:>6}", font=secondary_font(18))
 
-            if stars >= part:
-                draw_text((104, -5 + y), f"P{part} ", align="left", font=main_font(25))
-
-                if self.config.what_to_show_on_right_side == "checkmark" or day_scores is None:
-                    draw_line((160, 35 + y, 150, 25 + y))
-                    draw_line((160, 35 + y, 180, 15 + y))
-
-                elif self.config.what_to_show_on_right_side == "time_and_rank":
-                    draw_text((105, 25 + y), "time", align="right", font=secondary_font(10))
-                    draw_text(
-                        (143, 3 + y),
-                        format_time(time),
-                        align="right",
-                        font=secondary_font(18),
-                    )
-                    if rank:
-                        draw_text(
-                            (105, 35 + y),
-                            "rank",
-                            align="right",
-                            font=secondary_font(10),
-                        )
-                        draw_text(
-                            (133, 23 + y),
-                            f"{rank:>6}",
-                            align="right",
-                            font=secondary_font(18),
-                        )
-
-                elif self.config.what_to_show_on_right_side == "loc":
-                    raise NotImplementedError("loc is not implemented yet")
+        if day_scores is None and not languages:
+            drawer.line((15, 85, 85, 85), fill=line_color, width=2)
 
-            else:
-                # Draw cross
-                draw_line((140, 15 + y, 160, 35 + y))
-                draw_line((140, 35 + y, 160, 15 + y))
+        return image
 
-        if day_scores is None and not languages:
-            draw_line((15, 85, 85, 85))
+    def _get_overlays(self, text_kwargs: Tuple, parts: Tuple) -> Tuple[Overlay, Overlay]:
+        """Returns the overlay with the "Day" label and the overlay with everything static on the right side.
+
+        The "Day" label is pasted before the day number, as they overlap for some days.
+        """
+        key = (text_kwargs, parts, self.config.what_to_show_on_right_side)
+        if key not in self._overlays:
+            text_kwargs = dict(text_kwargs)
+            line_color = text_kwargs["fill"]
+            label_overlay = Overlay((200, 100))
+            label_overlay.add_text((3, -5), "Day", font=main_font(20), **text_kwargs)
+
+            right_overlay = Overlay((200, 100))
+            for part, (solved, color_override, show_checkmark, has_rank) in zip((1, 2), parts):
+                y = 50 if part == 2 else 0
+                text_kwargs["fill"] = color_override
+                if solved:
+                    right_overlay.add_text((104, -5 + y), f"P{part} ", font=main_font(25), **text_kwargs)
+
+                    if show_checkmark:
+                        right_overlay.add_line((160, 35 + y, 150, 25 + y), line_color, width=2)
+                        right_overlay.add_line((160, 35 + y, 180, 15 + y), line_color, width=2)
+
+                    elif self.config.what_to_show_on_right_side == "time_and_rank":
+                        right_overlay.add_text((105, 25 + y), "time", font=secondary_font(10), **text_kwargs)
+                        if has_rank:
+                            right_overlay.add_text((105, 35 + y), "rank", font=secondary_font(10), **text_kwargs)
+
+                    elif self.config.what_to_show_on_right_side == "loc":
+                        raise NotImplementedError("loc is not implemented yet")
 
-        # === Divider lines ===
-        draw_line((100, 5, 100, 95), width=1)
-        draw_line((105, 50, 195, 50), width=1)
+                else:
+                    # Draw cross
+                    right_overlay.add_line((140, 15 + y, 160, 35 + y), line_color, width=2)
+                    right_overlay.add_line((140, 35 + y, 160, 15 + y), line_color, width=2)
 
-        image.save(path)
+            # === Divider lines ===
+            right_overlay.add_line((100, 5, 100, 95), line_color, width=1)
+            right_overlay.add_line((105, 50, 195, 50), line_color, width=1)
+            self._overlays[key] = (label_overlay, right_overlay)
+        return self._overlays[key]
 
     def _get_alternating_background(self, languages, both_parts_completed=True, *, stripe_width=20):
-        colors = [ImageColor.getrgb(extension_to_colors()[language]) for language in languages]
+        colors = [extension_to_rgb()[language] for language in languages]
         if len(colors) == 1:
             colors.append(darker_color(colors[0]))
-        image = Image.new("RGB", (200, 100), self.config.not_completed_color)
-
-        def fill_with_colors(colors, fill_only_half):
-            for x in range(image.width):
-                for y in range(image.height):
-                    if fill_only_half and x / image.width + y / image.height > 1:
-                        continue
-                    image.load()[x, y] = colors[((x + y) // stripe_width) % len(colors)]
-
-        fill_with_colors(
-            [
-                self.config.not_completed_color,
-                darker_color(self.config.not_completed_color),
-            ],
-            False,
+        image = alternating_background(
+            tuple(colors),
+            tuple(self.config.not_completed_color),
+            both_parts_completed,
+            stripe_width=stripe_width,
         )
-        if colors:
-            fill_with_colors(colors, not both_parts_completed)
-        return image
+        # The background is shared between all tiles with the same languages, so it must not be drawn on
+        return image.copy()
+
+
+def _diagonal_stripes(colors, size: Tuple[int, int], stripe_width: int) -> Image.Image:
+    """Creates an image with diagonal stripes, where each stripe has the next color in colors."""
+    width, height = size
+    # Each row is the previous row shifted by one pixel, so all rows are slices of the same diagonal
+    diagonal = bytes((i // stripe_width) % len(colors) for i in range(width + height))
+    image = Image.frombytes("P", size, b"".join(diagonal[y : y + width] for y in range(height)))
+    image.putpalette([min(max(channel, 0), 255) for color in colors for channel in color[:3]])
+    return image.convert("RGB")
+
+
+@lru_cache
+def _upper_left_triangle_mask(size: Tuple[int, int]) -> Image.Image:
+    """Mask which covers all pixels above the diagonal from the bottom left to the top right corner."""
+    width, height = size
+    rows = []
+    for y in range(height):
+        covered = 0
+        while covered < width and not covered / width + y / height > 1:
+            covered += 1
+        rows.append(b"\xff" * covered + b"\x00" * (width - covered))
+    return Image.frombytes("L", size, b"".join(rows))
+
+
+@lru_cache(maxsize=256)
+def alternating_background(
+    colors: Tuple[Tuple[int, ...], ...],
+    not_completed_color: Tuple[int, ...],
+    both_parts_completed: bool,
+    *,
+    stripe_width: int = 20,
+    size: Tuple[int, int] = (200, 100),
+) -> Image.Image:
+    """Striped background in the language colors, cached as identical language combinations are common.
+
+    If only one part is completed, only the upper left half is filled with the language colors.
+    """
+    image = _diagonal_stripes([not_completed_color, darker_color(not_completed_color)], size, stripe_width)
+    if colors:
+        stripes = _diagonal_stripes(colors, size, stripe_width)
+        if both_parts_completed:
+            image = stripes
+        else:
+            image.paste(stripes, mask=_upper_left_triangle_mask(size))
+    return image
+
+
+@lru_cache(maxsize=256)
+def _glow_layer(
+    size: Tuple[int, int],
+    pos: Tuple[int, int],
+    text: str,
+    color: Tuple[int, int, int],
+    font: ImageFont.FreeTypeFont,
+    glow_size: int,
+    glow_alpha: int,
+) -> Optional[Tuple[Image.Image, Tuple[int, int]]]:
+    """Blurred glow of a text and where to composite it, None if it is outside of the image.
+
+    The labels, stars and day numbers of the aoc theme are at the same position on many tiles, so their glow is
+    only blurred once per process.
+    """
+    from PIL import ImageFilter
+
+    # The gaussian blur is approximated by three box blurs, which reach at most 3 * radius pixels
+    padding = 3 * glow_size + 1
+    left, top, right, bottom = text_bbox(pos, text, font)
+    box = (
+        max(0, int(left) - padding),
+        max(0, int(top) - padding),
+        min(size[0], int(right) + padding + 1),
+        min(size[1], int(bottom) + padding + 1),
+    )
+    if box[0] >= box[2] or box[1] >= box[3]:
+        return None
+    local_pos = (pos[0] - box[0], pos[1] - box[1])
+
+    # Create a transparent layer for the glow, covering only the text
+    glow_mask = Image.new("L", (box[2] - box[0], box[3] - box[1]), 0)
+    draw_text(ImageDraw.ImageDraw(glow_mask), local_pos, text, 255, font)
+
+    # Draw text for the glow multiple times to build up intensity
+    glow_layer = Image.new("RGBA", glow_mask.size, (0, 0, 0, 0))
+    glow_color = (*color, glow_alpha)
+    for _ in range(12):  # Draw multiple times to increase intensity before blur
+        glow_layer.paste(glow_color, mask=glow_mask)
+
+    # Blur the glow layer to create soft glow
+    return glow_layer.filter(ImageFilter.GaussianBlur(radius=glow_size)), box[:2]
 
 
 # Christmas-themed ASCII patterns for tiling background
@@ -220,10 +399,16 @@ class AocTheme(Theme):
     AOC_TEXT_DIM = (68, 68, 68)  # Dimmed text
     AOC_TEXT_BRIGHT = (204, 204, 204)  # Bright text
 
+    def common_texts(self) -> List[Tuple[ImageFont.FreeTypeFont, str, int]]:
+        texts = [(secondary_font(22), f"Day {day:02d}") for day in range(1, 26)]
+        texts += [(secondary_font(22), stars) for stars in ("--", "*", "**")]
+        texts += [(secondary_font(14), text) for text in ("P1:", "P2:", "P1: ", "P2: ", "[OK]", "[--]")]
+        return [(font, text, 0) for font, text in texts]
+
     def _get_language_color(self, languages: List[str]) -> Tuple[int, int, int]:
         """Get the GitHub language color for the first language."""
         if languages:
-            return ImageColor.getrgb(extension_to_colors()[languages[0]])
+            return extension_to_rgb()[languages[0]]
         return self.AOC_TEXT_DIM
 
     def _dim_color(self, color: Tuple[int, int, int], factor: float = 0.4) -> Tuple[int, int, int]:
@@ -244,44 +429,34 @@ class AocTheme(Theme):
         glow_size: int = 5,
         glow_alpha: int = 255,
     ):
-        """Draw text with a soft glow effect using RGBA compositing."""
-        from PIL import ImageFilter
-
-        # Create a transparent layer for the glow
-        glow_layer = Image.new("RGBA", image.size, (0, 0, 0, 0))
-        glow_drawer = ImageDraw.ImageDraw(glow_layer)
-
-        # Draw text for the glow multiple times to build up intensity
-        glow_color = (*color, glow_alpha)
-        for _ in range(12):  # Draw multiple times to increase intensity before blur
-            glow_drawer.text(pos, text, fill=glow_color, font=font)
+        """Draw text with a soft glow effect onto an RGBA image in place.
 
-        # Blur the glow layer to create soft glow
-        glow_layer = glow_layer.filter(ImageFilter.GaussianBlur(radius=glow_size))
+        Only the bounding box of the text (padded by the reach of the blur) is blurred and composited,
+        so all glowing texts of a tile share a single RGBA canvas without full-size intermediate layers.
+        """
+        glow = _glow_layer(image.size, pos, text, color, font, glow_size, glow_alpha)
+        if glow is None:
+            return
+        glow_layer, dest = glow
 
         # Composite the glow multiple times to intensify it
-        image_rgba = image.convert("RGBA")
         for _ in range(3):
-            image_rgba = Image.alpha_composite(image_rgba, glow_layer)
+            image.alpha_composite(glow_layer, dest=dest)
 
         # Draw main text on top (fully opaque)
-        text_drawer = ImageDraw.ImageDraw(image_rgba)
-        text_drawer.text(pos, text, fill=(*color, 255), font=font)
+        draw_text(ImageDraw.ImageDraw(image), pos, text, (*color, 255), font)
 
-        # Convert back and paste
-        image.paste(image_rgba.convert("RGB"), (0, 0))
-
-    def draw_tile(
+    def render_tile(
         self,
         day: str,
         languages: List[str],
         day_scores: Union[DayScores, None],
-        path: Path,
         stars: int,
-    ) -> None:
+    ) -> Image.Image:
         """Draw an AoC-themed tile."""
         lang_color = self._get_language_color(languages)
-        image = self._create_background(languages, lang_color, stars)
+        # Glowing text is composited in RGBA, the image is converted back to RGB only once at the end
+        image = self._create_background(languages, lang_color, stars).convert("RGBA")
         drawer = ImageDraw.ImageDraw(image)
 
         mono_font = secondary_font  # SourceCodePro is already monospace
@@ -338,7 +513,7 @@ class AocTheme(Theme):
                     time_str = format_time(time) if time else "-----"
 
                     # Highlight top 100
-                    rank_color = self.AOC_GOLD if rank and int(rank) <= 100 else part_color
+                    rank_color = self.AOC_GOLD if rank and rank <= 100 else part_color
 
                     self._draw_glowing_text(image, (10, y_offset), f"P{part}:", part_color, mono_font(14))
                     self._draw_glowing_text(image, (45, y_offset), time_str, part_color, mono_font(14))
@@ -357,31 +532,21 @@ class AocTheme(Theme):
                     self._draw_glowing_text(image, (10, y_offset), f"P{part}: ", part_color, mono_font(14))
                     self._draw_glowing_text(image, (50, y_offset), "[OK]", self.AOC_GREEN, mono_font(14))
             else:
-                drawer.text(
-                    (10, y_offset),
-                    f"P{part}: ",
-                    fill=self.AOC_TEXT_DIM,
-                    font=mono_font(14),
-                )
-                drawer.text((50, y_offset), "[--]", fill=self.AOC_TEXT_DIM, font=mono_font(14))
+                draw_text(drawer, (10, y_offset), f"P{part}: ", self.AOC_TEXT_DIM, mono_font(14))
+                draw_text(drawer, (50, y_offset), "[--]", self.AOC_TEXT_DIM, mono_font(14))
 
-        image.save(path)
+        return image.convert("RGB")
 
     def _create_background(self, languages: List[str], lang_color: Tuple[int, int, int], stars: int) -> Image.Image:
         """Create a dark background with subtle language-colored tint and ASCII art."""
-        image = Image.new("RGB", (200, 100), self.AOC_BG_BASE)
-
         # Create a subtle gradient/tint based on language color
-        pixels = image.load()
         blend = 0.08 if stars > 0 else 0.03
         bg_tinted = (
             int(self.AOC_BG_BASE[0] * (1 - blend) + lang_color[0] * blend),
             int(self.AOC_BG_BASE[1] * (1 - blend) + lang_color[1] * blend),
             int(self.AOC_BG_BASE[2] * (1 - blend) + lang_color[2] * blend),
         )
-        for x in range(image.width):
-            for y in range(image.height):
-                pixels[x, y] = bg_tinted
+        image = Image.new("RGB", (200, 100), bg_tinted)
 
         # Draw ASCII art in the background using language color
         self._draw_ascii_decoration(image, languages, lang_color)
@@ -396,23 +561,27 @@ class AocTheme(Theme):
         (120, 120, 50),  # Yellow
     ]
 
+    # Rendered decoration layers of this process, see _get_ascii_decoration
+    _decoration_layers: Dict[Tuple, Image.Image] = {}
+
     def _draw_ascii_decoration(self, image: Image.Image, languages: List[str], lang_color: Tuple[int, int, int]):
         """Draw tiling Christmas ASCII pattern with colorful lights."""
-        from PIL import ImageFilter
-
-        # Create a separate layer for the ASCII art so we can blur it
-        ascii_layer = Image.new("RGB", image.size, self.AOC_BG_BASE)
-        drawer = ImageDraw.ImageDraw(ascii_layer)
+        # Paste the blurred ASCII layer onto the image
+        image.paste(self._get_ascii_decoration(languages, image.size), (0, 0))
 
-        # Use a small monospace font for the ASCII pattern
-        tiny_font = secondary_font(8)
+    def _get_ascii_decoration(self, languages: List[str], size: Tuple[int, int]) -> Image.Image:
+        """Get the blurred ASCII layer for the languages.
 
+        There are only a few distinct layers (one per pattern and color mapping), so they are rendered once
+        and cached both in memory and, if there is one, in the cache directory.
+        """
         # Create a deterministic seed from languages
         lang_str = "".join(sorted(languages)) if languages else "default"
         seed = sum(ord(c) * (i + 1) for i, c in enumerate(lang_str))
 
         # Pick a pattern based on seed for consistency
-        pattern = AOC_ASCII_PATTERNS[seed % len(AOC_ASCII_PATTERNS)]
+        pattern_index = seed % len(AOC_ASCII_PATTERNS)
+        pattern = AOC_ASCII_PATTERNS[pattern_index]
 
         # Create a consistent color mapping for each character based on seed
         char_color_map = {}
@@ -420,6 +589,37 @@ class AocTheme(Theme):
         for i, char in enumerate(all_chars):
             char_color_map[char] = self.XMAS_COLORS[(seed + ord(char)) % len(self.XMAS_COLORS)]
 
+        key = (pattern_index, tuple(char_color_map.items()), size)
+        if key not in self._decoration_layers and self.config.cache_dir is None:
+            self._decoration_layers[key] = self._render_ascii_decoration(pattern, char_color_map, size)
+        elif key not in self._decoration_layers:
+            digest = hashlib.sha256(repr((key, package_version())).encode()).hexdigest()[:16]
+            cache_path = Path(self.config.cache_dir) / "aoc_theme" / f"decoration-{digest}.png"
+            if cache_path.exists():
+                layer = Image.open(cache_path)
+                layer.load()
+            else:
+                layer = self._render_ascii_decoration(pattern, char_color_map, size)
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                # Tiles are drawn in parallel, so write to a unique file first to avoid reading partial files
+                temp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+                layer.save(temp_path, format="PNG")
+                os.replace(temp_path, cache_path)
+            self._decoration_layers[key] = layer
+        return self._decoration_layers[key]
+
+    def _render_ascii_decoration(
+        self, pattern: List[str], char_color_map: Dict[str, Tuple[int, int, int]], size: Tuple[int, int]
+    ) -> Image.Image:
+        from PIL import ImageFilter
+
+        # Create a separate layer for the ASCII art so we can blur it
+        ascii_layer = Image.new("RGB", size, self.AOC_BG_BASE)
+        drawer = ImageDraw.ImageDraw(ascii_layer)
+
+        # Use a small monospace font for the ASCII pattern
+        tiny_font = secondary_font(8)
+
         # Calculate pattern dimensions
         pattern_height = len(pattern)
         pattern_width = len(pattern[0]) if pattern else 0
@@ -430,8 +630,8 @@ class AocTheme(Theme):
         tile_height = pattern_height * char_height
 
         # Tile the pattern across the entire background
-        for tile_y in range(-tile_height, image.height + tile_height, tile_height):
-            for tile_x in range(-tile_width, image.width + tile_width, tile_width):
+        for tile_y in range(-tile_height, ascii_layer.height + tile_height, tile_height):
+            for tile_x in range(-tile_width, ascii_layer.width + tile_width, tile_width):
                 for line_idx, line in enumerate(pattern):
                     for char_idx, char in enumerate(line):
                         if char != " ":
@@ -447,10 +647,7 @@ class AocTheme(Theme):
                             )
 
         # Apply slight blur to the ASCII layer
-        ascii_layer = ascii_layer.filter(ImageFilter.GaussianBlur(radius=0.5))
-
-        # Paste the blurred ASCII layer onto the image
-        image.paste(ascii_layer, (0, 0))
+        return ascii_layer.filter(ImageFilter.GaussianBlur(radius=0.5))
 
 
 def get_theme(config) -> Theme:
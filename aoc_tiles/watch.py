@@ -0,0 +1,190 @@
+"""Watch mode, which updates the tiles and README whenever solutions are added, removed or git added.
+
+On Linux, inotify is used through ctypes. On other systems, or if inotify is not available, the solution
+files are polled instead.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from aoc_tiles.make_tiles import TileMaker
+from aoc_tiles.render import RenderPool
+from aoc_tiles.solutions import SolutionMatcher
+
+# Changes within this time are handled together, e.g. when checking out a branch
+DEBOUNCE_SECONDS = 0.2
+POLL_INTERVAL_SECONDS = 1.0
+# Changed path reported when the git index changes, e.g. after git add
+GIT_INDEX = ".git/index"
+
+
+class PollingWatcher:
+    """Detects changes by comparing the solution files and the git index state every interval."""
+
+    def __init__(self, aoc_dir: Path, matcher: SolutionMatcher, git_dir: Optional[Path]):
+        self.aoc_dir = aoc_dir
+        self.matcher = matcher
+        self.git_index_path = git_dir / "index" if git_dir is not None else None
+
+    def _snapshot(self) -> Tuple[Set[str], Optional[Tuple[int, int]]]:
+        files = set()
+        for current, directories, names in os.walk(self.aoc_dir):
+            relative = Path(current).relative_to(self.aoc_dir).as_posix()
+            prefix = "" if relative == "." else relative + "/"
+            directories[:] = [d for d in directories if self.matcher.should_walk_directory(d, prefix + d)]
+            files.update(prefix + name for name in names if self.matcher.is_solution_file(prefix + name))
+        index_state = None
+        if self.git_index_path is not None and self.git_index_path.exists():
+            stat = self.git_index_path.stat()
+            index_state = (stat.st_mtime_ns, stat.st_size)
+        return files, index_state
+
+    def changes(self) -> Iterator[List[str]]:
+        files, index_state = self._snapshot()
+        while True:
+            time.sleep(POLL_INTERVAL_SECONDS)
+            new_files, new_index_state = self._snapshot()
+            changed = sorted(files ^ new_files)
+            if new_index_state != index_state:
+                changed.append(GIT_INDEX)
+            files, index_state = new_files, new_index_state
+            if changed:
+                yield changed
+
+
+class InotifyWatcher:
+    """Watches all directories which may contain solutions, and the git directory, with inotify."""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+
+    # Only files being added, removed or renamed change the tiles, not their content
+    DIRECTORY_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+    # Git writes index.lock and renames it to index
+    GIT_DIR_MASK = IN_MOVED_TO | IN_CLOSE_WRITE
+
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, aoc_dir: Path, matcher: SolutionMatcher, git_dir: Optional[Path]):
+        self.aoc_dir = aoc_dir
+        self.matcher = matcher
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch descriptor to the directory relative to aoc_dir, None for the git directory
+        self.watches: Dict[int, Optional[str]] = {}
+        if git_dir is not None:
+            self._add_watch(git_dir, None, self.GIT_DIR_MASK)
+        self._add_watches_recursively("")
+
+    def _add_watch(self, path: Path, relative: Optional[str], mask: int):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            logger.warning("Could not watch {}: {}", path, os.strerror(ctypes.get_errno()))
+            return
+        self.watches[wd] = relative
+
+    def _add_watches_recursively(self, relative: str):
+        self._add_watch(self.aoc_dir / relative, relative, self.DIRECTORY_MASK)
+        try:
+            entries = list(os.scandir(self.aoc_dir / relative))
+        except OSError:
+            return
+        for entry in entries:
+            entry_relative = f"{relative}/{entry.name}" if relative else entry.name
+            if entry.is_dir(follow_symlinks=False) and self.matcher.should_walk_directory(entry.name, entry_relative):
+                self._add_watches_recursively(entry_relative)
+
+    def _read_events(self) -> List[str]:
+        changed = []
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were lost, the rediscovery after any change finds what changed
+                changed.append(GIT_INDEX)
+                continue
+            if wd not in self.watches:
+                continue
+            relative = self.watches[wd]
+            if relative is None:
+                if name == "index":
+                    changed.append(GIT_INDEX)
+                continue
+            path = f"{relative}/{name}" if relative else name
+            if mask & self.IN_ISDIR:
+                if not self.matcher.should_walk_directory(name, path):
+                    continue
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._add_watches_recursively(path)
+                changed.append(path)
+            elif self.matcher.is_solution_file(path):
+                changed.append(path)
+        return changed
+
+    def changes(self) -> Iterator[List[str]]:
+        while True:
+            select.select([self.fd], [], [])
+            changed = self._read_events()
+            deadline = time.monotonic() + DEBOUNCE_SECONDS
+            while (remaining := deadline - time.monotonic()) > 0 and select.select([self.fd], [], [], remaining)[0]:
+                changed.extend(self._read_events())
+            if changed:
+                yield sorted(set(changed))
+
+
+def create_watcher(aoc_dir: Path, matcher: SolutionMatcher, git_dir: Optional[Path]):
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(aoc_dir, matcher, git_dir)
+        except (OSError, AttributeError) as error:
+            logger.warning("Could not use inotify, polling for changes instead: {}", error)
+    return PollingWatcher(aoc_dir, matcher, git_dir)
+
+
+def watch(tile_maker: TileMaker):
+    """Runs make_tiles, then updates the outputs on every change until interrupted.
+
+    With --auto-add-tiles-to-git=amend, the outputs are only git added, as there is no new commit to amend.
+
+    The render pool is kept alive in between, so that the fonts and language table stay loaded in the workers.
+    """
+    config = tile_maker.config
+    if config.auto_add_tiles_to_git == "amend":
+        # Changes are not committed in watch mode, amending would add staged work to the previous commit
+        print("Watch mode never amends commits, the tiles are only added to git")
+        config.auto_add_tiles_to_git = "add"
+    solution_finder = tile_maker.solution_finder
+    repository = solution_finder.repository
+    git_dir = Path(repository.git_dir) if repository is not None else None
+    with RenderPool(config) as render_pool:
+        tile_maker.render_pool = render_pool
+        tile_maker.make_tiles()
+        watcher = create_watcher(Path(config.aoc_dir), solution_finder.matcher, git_dir)
+        print(f"Watching {config.aoc_dir} for changes with {type(watcher).__name__}, press Ctrl+C to stop")
+        try:
+            for changed_paths in watcher.changes():
+                logger.info("Changed: {}", changed_paths)
+                tile_maker.update_changed(changed_paths)
+        except KeyboardInterrupt:
+            print("Stopped watching")
@@ -0,0 +1,44 @@
+"""Atomic writing of output files, which leaves files untouched if their content did not change.
+
+Untouched files keep their mtime, so editors, file watchers and git do not see a change.
+"""
+
+import os
+from pathlib import Path
+
+
+def _has_content(path: Path, data: bytes) -> bool:
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        return path.read_bytes() == data
+    except OSError:
+        return False
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """Writes data to path, unless it already has this content. Returns whether the file was written.
+
+    The data is written to a temporary file next to the path, which then replaces the path. Therefore, readers
+    never see a partially written file, even if the process is interrupted.
+    """
+    path = Path(path)
+    if _has_content(path, data):
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        if path.exists():
+            os.chmod(tmp_path, path.stat().st_mode)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return True
+
+
+def write_text_if_changed(path: Path, text: str, encoding: str = "utf-8") -> bool:
+    """Same as write_if_changed, with the platform's line endings like a file opened in text mode."""
+    return write_if_changed(path, text.replace("\n", os.linesep).encode(encoding))
@@ -0,0 +1,295 @@
+"""Microbenchmarks for rendering tiles, parsing leaderboards, generating the HTML and starting the hook.
+
+Everything runs offline in a temporary directory. Save the results of a run as a baseline, then compare later runs
+against it to find regressions:
+
+    python -m tests.benchmark run --output baseline.json
+    python -m tests.benchmark run --output new.json
+    python -m tests.benchmark compare baseline.json new.json
+
+Benchmarks can be selected with --filter, e.g. --filter render/aoc. Only compare results from the same machine.
+
+Each run of a render benchmark draws a different day with different languages and scores, so that the caches of
+the themes only hit as often as in a real run. The render_cold benchmarks also clear these caches before each run,
+which is what a tile costs in a new process.
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Median time in milliseconds which importing the hook entry point may take, see cli.main
+STARTUP_BUDGET_MS = 50.0
+# A benchmark regressed if it got slower by more than this fraction and by more than the minimum difference
+DEFAULT_THRESHOLD = 0.15
+MIN_DIFFERENCE_MS = 0.2
+
+THEMES = ["modern", "aoc"]
+ANIMATIONS = ["none", "snow"]
+RIGHT_SIDES = ["checkmark", "time_and_rank"]
+# More languages than runs of a benchmark, so that the tiles of a benchmark do not repeat
+LANGUAGES = [".py", ".rs", ".kt", ".hs", ".go", ".c", ".cpp", ".java", ".js", ".ts", ".rb", ".jl", ".cs", ".swift"]
+LANGUAGES += [".scala", ".ex", ".clj", ".ml", ".nim", ".zig", ".lua", ".php", ".dart", ".pl", ".sh", ".f90"]
+LANGUAGE_COUNTS = [0, 1, 4]
+
+
+def measure(
+    function: Callable[[], object], repeat: int, setup: Optional[Callable[[], object]] = None
+) -> Dict[str, float]:
+    """Runs the function once to warm up, then returns statistics of repeat runs in milliseconds.
+
+    The setup is called before each run, without being measured.
+    """
+    function()
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(times), "min_ms": min(times), "repeat": repeat}
+
+
+def _create_aoc_dir(directory: Path) -> Path:
+    (directory / "README.md").write_text("<!-- AOC TILES BEGIN -->\n<!-- AOC TILES END -->\n")
+    return directory
+
+
+def _clear_render_caches(drawer):
+    from aoc_tiles import glyphs, themes
+
+    themes.alternating_background.cache_clear()
+    themes._glow_layer.cache_clear()
+    themes.AocTheme._decoration_layers.clear()
+    glyphs._rasterize.cache_clear()
+    glyphs._persisted_masks.clear()
+    getattr(drawer.theme, "_overlays", {}).clear()
+
+
+def render_benchmarks(aoc_dir: Path, repeat: int, animated_repeat: int) -> Dict[str, Callable[[], Dict]]:
+    from aoc_tiles.config import Config
+    from aoc_tiles.drawer import TileDrawer
+    from aoc_tiles.leaderboard import DayScores
+
+    def tile_inputs(language_count: int) -> Iterator[Tuple]:
+        """Endless different days, languages and scores."""
+        for i in itertools.count():
+            day = i % 25 + 1
+            languages = [LANGUAGES[(i + j * 7) % len(LANGUAGES)] for j in range(language_count)]
+            day_scores = DayScores(600 + i * 37, 100 + i * 13, 0, 1200 + i * 53, 50 + i * 11, 0)
+            yield f"{day:02}", languages, day_scores, 1 if i % 3 == 2 else 2
+
+    benchmarks = {}
+    for cold, theme, animation, right_side, language_count in itertools.product(
+        [False, True], THEMES, ANIMATIONS, RIGHT_SIDES, LANGUAGE_COUNTS
+    ):
+
+        def benchmark(
+            cold=cold, theme=theme, animation=animation, right_side=right_side, language_count=language_count
+        ):
+            config = Config(
+                aoc_dir=str(aoc_dir), theme=theme, animation=animation, what_to_show_on_right_side=right_side
+            )
+            drawer = TileDrawer(config)
+            inputs = tile_inputs(language_count)
+
+            def render():
+                day, languages, day_scores, stars = next(inputs)
+                image = drawer.render_tile(day, languages, day_scores, stars=stars)
+                drawer.encode_tile(image, io.BytesIO(), seed=f"benchmark/{day}")
+
+            setup = (lambda: _clear_render_caches(drawer)) if cold else None
+            return measure(render, animated_repeat if animation != "none" else repeat, setup)
+
+        kind = "render_cold" if cold else "render"
+        benchmarks[f"{kind}/{theme}/{animation}/{right_side}/{language_count}_languages"] = benchmark
+    return benchmarks
+
+
+def _leaderboard_html(days: int) -> str:
+    rows = []
+    for day in range(days, 0, -1):
+        rows.append(f"{day:3}   00:{day:02}:13   {day * 97:5}      0   01:{day:02}:45   {day * 131:5}      0")
+    return (
+        "<article><pre>      "
+        '<span class="leaderboard-daydesc-first">--------Part 1--------</span>   '
+        '<span class="leaderboard-daydesc-both">--------Part 2--------</span>\n'
+        'Day   <span class="leaderboard-daydesc-first">    Time   Rank  Score</span>   '
+        '<span class="leaderboard-daydesc-both">    Time   Rank  Score</span>\n'
+        + "\n".join(rows)
+        + "\n</pre></article>"
+    )
+
+
+def leaderboard_benchmarks(aoc_dir: Path, repeat: int) -> Dict[str, Callable[[], Dict]]:
+    from aoc_tiles.leaderboard import _parse_leaderboard
+
+    path = aoc_dir / "leaderboard.html"
+    path.write_text(_leaderboard_html(25))
+
+    def benchmark():
+        return measure(lambda: _parse_leaderboard(path), repeat)
+
+    return {"leaderboard/parse_25_days": benchmark}
+
+
+def html_benchmarks(aoc_dir: Path, repeat: int) -> Dict[str, Callable[[], Dict]]:
+    from aoc_tiles.config import Config
+    from aoc_tiles.html import HTML
+    from aoc_tiles.leaderboard import DayScores
+    from aoc_tiles.make_tiles import TileMaker, YearData
+
+    def benchmark():
+        with contextlib.redirect_stdout(io.StringIO()):
+            tile_maker = TileMaker(Config(aoc_dir=str(aoc_dir)))
+        years = {
+            year: YearData(
+                day_to_scores={day: DayScores(600, day, 0, 1200, day, 0) for day in range(1, 26)},
+                day_to_paths={
+                    day: [Path(f"{year}/{day:02}/solution{ext}") for ext in LANGUAGES[:4]] for day in range(1, 26)
+                },
+                day_to_stars={day: 2 for day in range(1, 26)},
+            )
+            for year in range(2015, 2025)
+        }
+        year_to_jobs = {year: tile_maker.create_year_tile_jobs(year, data) for year, data in years.items()}
+
+        def generate():
+            html = HTML()
+            for year, data in years.items():
+                tile_maker.handle_year(year, data, html, year_to_jobs[year])
+            return str(html)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            return measure(generate, repeat)
+
+    return {"html/10_years": benchmark}
+
+
+def _run_python(code: str) -> float:
+    start = time.perf_counter()
+    # From the root of the repository, so that the package is importable without installing it
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parent.parent)
+    return (time.perf_counter() - start) * 1000
+
+
+def startup_benchmarks(repeat: int) -> Dict[str, Callable[[], Dict]]:
+    def benchmark():
+        # Interpreter startup is subtracted, as it depends on the machine and not on this package
+        times = [_run_python("import aoc_tiles.cli") - _run_python("pass") for _ in range(repeat)]
+        return {"median_ms": statistics.median(times), "min_ms": min(times), "repeat": repeat}
+
+    return {"startup/import_cli": benchmark}
+
+
+def _environment() -> Dict[str, str]:
+    import PIL
+
+    from aoc_tiles.cache import package_version
+
+    return {
+        "aoc_tiles": package_version(),
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "machine": f"{platform.system()} {platform.machine()}",
+        "cpus": str(os.cpu_count()),
+    }
+
+
+def run(output: Path, repeat: int, animated_repeat: int, name_filter: Optional[str]) -> int:
+    from loguru import logger
+
+    # Otherwise loguru prints debug messages, which would be measured as well, unless a Config removed its sink
+    logger.remove()
+    with tempfile.TemporaryDirectory() as directory:
+        aoc_dir = _create_aoc_dir(Path(directory))
+        benchmarks = {
+            **render_benchmarks(aoc_dir, repeat, animated_repeat),
+            **leaderboard_benchmarks(aoc_dir, repeat),
+            **html_benchmarks(aoc_dir, repeat),
+            **startup_benchmarks(max(repeat // 4, 3)),
+        }
+        results = {}
+        for name, benchmark in benchmarks.items():
+            if name_filter is not None and name_filter not in name:
+                continue
+            results[name] = benchmark()
+            print(f"{name:<50} {results[name]['median_ms']:9.2f} ms (min {results[name]['min_ms']:.2f} ms)")
+
+    with open(output, "w") as file:
+        json.dump({"environment": _environment(), "results": results}, file, indent=1, sort_keys=True)
+    print(f"Wrote {len(results)} results to {output}")
+
+    startup = results.get("startup/import_cli")
+    if startup is not None and startup["median_ms"] > STARTUP_BUDGET_MS:
+        print(f"Importing the hook takes {startup['median_ms']:.1f} ms, over the budget of {STARTUP_BUDGET_MS} ms!")
+        return 1
+    return 0
+
+
+def compare(baseline_path: Path, new_path: Path, threshold: float) -> int:
+    """Prints the change of each benchmark and returns 1 if any of them regressed, otherwise 0."""
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+    if baseline["environment"] != new["environment"]:
+        print(f"Warning: environments differ, baseline {baseline['environment']} and new {new['environment']}")
+
+    regressions: List[str] = []
+    for name in sorted(baseline["results"].keys() & new["results"].keys()):
+        before = baseline["results"][name]["median_ms"]
+        after = new["results"][name]["median_ms"]
+        change = after / before - 1 if before > 0 else 0.0
+        regressed = change > threshold and after - before > MIN_DIFFERENCE_MS
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<50} {before:9.2f} ms -> {after:9.2f} ms {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+
+    for name in sorted(baseline["results"].keys() ^ new["results"].keys()):
+        print(f"{name:<50} only in {'baseline' if name in baseline['results'] else 'new results'}")
+
+    if regressions:
+        print(f"{len(regressions)} benchmarks are more than {threshold:.0%} slower than the baseline")
+        return 1
+    print("No regressions")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for AoC-Tiles")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks and save the results as JSON.")
+    run_parser.add_argument("--output", type=Path, default=Path("benchmark.json"))
+    run_parser.add_argument("--repeat", type=int, default=20, help="Runs per benchmark.")
+    run_parser.add_argument("--animated-repeat", type=int, default=5, help="Runs per animated tile benchmark.")
+    run_parser.add_argument("--filter", help="Only run benchmarks containing this string.")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare results with a baseline.")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("new", type=Path)
+    compare_parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative slowdown counted as a regression."
+    )
+
+    args = parser.parse_args()
+    if args.command == "run":
+        sys.exit(run(args.output, args.repeat, args.animated_repeat, args.filter))
+    sys.exit(compare(args.baseline, args.new, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from aoc_tiles import leaderboard
+from aoc_tiles.config import Config
+from aoc_tiles.leaderboard import DayScores, LeaderboardFetcher
+from aoc_tiles.make_tiles import TileMaker
+
+LEADERBOARD_HTML = (
+    '<pre><span class="leaderboard-daydesc-both">      Time   Rank  Score</span>\n'
+    "  2   01:10:00  1500  0   02:20:00  2400  0\n"
+    "  1   00:10:00  500  0   00:20:00  400  0\n"
+    "</pre>"
+)
+
+
+@pytest.fixture
+def leaderboard_server(monkeypatch) -> List[Tuple[str, int]]:
+    """Serves the same leaderboard for every year. Returns the requested paths and client ports."""
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            requests.append((self.path, self.client_address[1]))
+            # Slow enough that only concurrent requests finish in time
+            time.sleep(0.2)
+            body = LEADERBOARD_HTML.encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/{{year}}/leaderboard/self"
+    monkeypatch.setattr(leaderboard, "PERSONAL_LEADERBOARD_URL", url)
+    yield requests
+    server.shutdown()
+    server.server_close()
+
+
+def _create_aoc_dir(directory: Path, solutions: List[str]) -> Path:
+    (directory / "README.md").write_text("<!-- AOC TILES BEGIN -->\n<!-- AOC TILES END -->\n")
+    (directory / ".aoc_tiles").mkdir()
+    (directory / ".aoc_tiles" / "session.cookie").write_text("a" * 128)
+    (directory / ".gitignore").write_text(".aoc_tiles/*\n")
+    for solution in solutions:
+        (directory / solution).parent.mkdir(parents=True, exist_ok=True)
+        (directory / solution).write_text("")
+    subprocess.run(["git", "init", "-q"], cwd=directory, check=True)
+    subprocess.run(["git", "add", "-A"], cwd=directory, check=True)
+    return directory
+
+
+def test_leaderboards_are_fetched_concurrently_with_one_session(tmp_path, leaderboard_server):
+    config = Config(aoc_dir=str(_create_aoc_dir(tmp_path, [])))
+    years = range(2015, 2023)
+    start = time.perf_counter()
+    with LeaderboardFetcher(config) as fetcher:
+        fetcher.prefetch(years)
+        year_to_scores = {year: fetcher.get(year) for year in years}
+
+    assert time.perf_counter() - start < 0.2 * len(years) / 2
+    assert sorted(path for path, _ in leaderboard_server) == [f"/{year}/leaderboard/self" for year in years]
+    # Connections are kept alive and reused, at most one per concurrent request
+    assert len({port for _, port in leaderboard_server}) <= leaderboard.MAX_PARALLEL_REQUESTS
+    assert year_to_scores[2020][2] == DayScores(4200, 1500, 0, 8400, 2400, 0)
+
+
+def test_only_leaderboards_of_years_with_solutions_are_downloaded(tmp_path, leaderboard_server):
+    aoc_dir = _create_aoc_dir(tmp_path, ["2022/01/solution.py"])
+    config = Config(aoc_dir=str(aoc_dir), what_to_show_on_right_side="time_and_rank")
+    # Outdated and incomplete leaderboard of a year whose solutions were removed
+    stale_path = aoc_dir / ".aoc_tiles" / "cache" / "leaderboard2021.html"
+    stale_path.parent.mkdir(parents=True)
+    stale_path.write_text(LEADERBOARD_HTML)
+    os.utime(stale_path, (time.time() - 3600, time.time() - 3600))
+
+    for _ in range(2):
+        solve_data = TileMaker(config).compose_solve_data()
+
+    assert list(solve_data.year_to_data) == [2022]
+    assert [path for path, _ in leaderboard_server] == ["/2022/leaderboard/self"]
@@ -0,0 +1,41 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from aoc_tiles.config import Config
+from aoc_tiles.make_tiles import TileMaker
+
+SAMPLE_DIR = Path(__file__).parent / "samples" / "year_day_day.kt"
+
+
+@pytest.fixture
+def aoc_dir(tmp_path) -> Path:
+    aoc_dir = tmp_path / "aoc"
+    shutil.copytree(SAMPLE_DIR, aoc_dir)
+    subprocess.run(["git", "init", "-q"], cwd=aoc_dir, check=True)
+    subprocess.run(["git", "add", "-A"], cwd=aoc_dir, check=True)
+    return aoc_dir
+
+
+def _image_names(aoc_dir: Path):
+    image_dir = aoc_dir / ".aoc_tiles" / "tiles"
+    return sorted(path.relative_to(image_dir).as_posix() for path in image_dir.rglob("*"))
+
+
+def test_switching_output_images_removes_outputs_of_other_mode(aoc_dir):
+    TileMaker(Config(aoc_dir=str(aoc_dir), output_images="tiles")).make_tiles()
+    assert "2022/01.png" in _image_names(aoc_dir)
+
+    TileMaker(Config(aoc_dir=str(aoc_dir), output_images="atlas")).make_tiles()
+    assert _image_names(aoc_dir) == ["2022.png"]
+
+    TileMaker(Config(aoc_dir=str(aoc_dir), output_images="tiles")).make_tiles()
+    assert "2022.png" not in _image_names(aoc_dir)
+    assert "2022/01.png" in _image_names(aoc_dir)
+
+
+def test_atlas_rejects_tile_width_not_in_pixels(aoc_dir):
+    with pytest.raises(SystemExit, match="tile width in pixels"):
+        Config(aoc_dir=str(aoc_dir), output_images="atlas", tile_width_px="50%")
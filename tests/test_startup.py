@@ -0,0 +1,19 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmark import STARTUP_BUDGET_MS, startup_benchmarks
+
+
+def test_import_cli_is_within_budget():
+    result = startup_benchmarks(repeat=7)["startup/import_cli"]()
+    assert result["median_ms"] <= STARTUP_BUDGET_MS, f"Importing aoc_tiles.cli took {result} ms"
+
+
+def test_import_cli_loads_no_heavy_modules():
+    heavy_modules = ["PIL", "git", "requests", "yaml", "loguru", "rich", "aoc_tiles.config"]
+    code = f"import sys, aoc_tiles.cli; print(','.join(m for m in {heavy_modules!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], check=True, cwd=Path(__file__).parent.parent, stdout=subprocess.PIPE
+    )
+    assert result.stdout.decode().strip() == ""